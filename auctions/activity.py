@@ -0,0 +1,169 @@
+"""Per-user activity summaries behind the "My activity" page.
+
+`UserActivity` keeps one row per user with the ids of the listings they lead, were
+outbid on, won and lost, plus their own listings, so the page reads a single row
+by primary key however many bids the user has placed. Bid placement, closing and
+listing creation move ids between the lists in their own transactions, touching
+only the rows of the users involved; `rebuild()` recomputes rows from the bid
+table and the bid archive.
+"""
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import ArchivedBidder, Bid, Listing, User, UserActivity
+
+# The lists an active listing moves between as bids arrive
+OPEN = ("winning", "outbid")
+
+
+def _locked(user_ids) -> dict[int, UserActivity]:
+    """Return the activity rows of `user_ids`, created if missing, locked for update."""
+    user_ids = sorted(set(user_ids))
+    # In primary key order, so concurrent bids cannot deadlock on these rows
+    activities = UserActivity.objects.select_for_update().order_by("pk")
+    rows = {activity.pk: activity for activity in activities.filter(pk__in=user_ids)}
+    missing = [user_id for user_id in user_ids if user_id not in rows]
+    if missing:
+        UserActivity.objects.bulk_create(
+            [UserActivity(user_id=user_id) for user_id in missing],
+            ignore_conflicts=True,
+        )
+        rows.update(
+            (activity.pk, activity) for activity in activities.filter(pk__in=missing)
+        )
+    return rows
+
+
+def _save(activities: dict[int, UserActivity], fields: list[str]) -> None:
+    # A plain UPDATE per row; a bid touches two or three users, for which
+    # `bulk_update()` costs more to build than it saves
+    for activity in activities.values():
+        activity.save(update_fields=fields)
+
+
+def _move(activity: UserActivity, listing_id: int, target: str) -> None:
+    """Move `listing_id` from the open lists to the end of the `target` list."""
+    for name in OPEN:
+        ids = getattr(activity, name)
+        if listing_id in ids:
+            ids.remove(listing_id)
+    getattr(activity, target).append(listing_id)
+
+
+def record_bids(
+    listing_id: int, bids: list[Bid], previous_leader_id: int | None, leader_id: int
+) -> None:
+    """Account for `bids` placed on a listing that `leader_id` now leads."""
+    user_ids = {bid.user_id for bid in bids}
+    if previous_leader_id is not None:
+        user_ids.add(previous_leader_id)
+    with transaction.atomic():
+        activities = _locked(user_ids)
+        for bid in bids:
+            activities[bid.user_id].bid_count += 1
+        for user_id, activity in activities.items():
+            _move(activity, listing_id, "winning" if user_id == leader_id else "outbid")
+        _save(activities, ["bid_count", *OPEN])
+
+
+def record_closed(winners: dict[int, int | None]) -> None:
+    """Move just closed listings (id: winner id) to the won and lost lists."""
+    if not winners:
+        return
+    closed = defaultdict(list)
+    bidders = (
+        Bid.objects.filter(listing__in=list(winners))
+        .values_list("user", "listing")
+        .distinct()
+    )
+    for user_id, listing_id in bidders:
+        closed[user_id].append(listing_id)
+    with transaction.atomic():
+        activities = _locked(closed)
+        for user_id, listing_ids in closed.items():
+            for listing_id in listing_ids:
+                won = winners[listing_id] == user_id
+                _move(activities[user_id], listing_id, "won" if won else "lost")
+        _save(activities, [*OPEN, "won", "lost"])
+
+
+def record_listing(listing: Listing) -> None:
+    """Add a new listing to its seller's own listings."""
+    with transaction.atomic():
+        activities = _locked([listing.user_id])
+        activities[listing.user_id].listings.append(listing.pk)
+        _save(activities, ["listings"])
+
+
+def rebuild(
+    user_ids: list[int] | None = None, batch_size: int = 1000, apps=global_apps
+) -> int:
+    """Recompute the activity rows of `user_ids` and return how many were rebuilt.
+
+    By default every user is rebuilt, a batch of users per transaction. A data
+    migration passes its historical `apps` to run the same rebuild.
+    """
+    ArchivedBidder, Bid, Listing, User, UserActivity = (
+        apps.get_model("auctions", name)
+        for name in ("ArchivedBidder", "Bid", "Listing", "User", "UserActivity")
+    )
+    users = User.objects.order_by("pk")
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    user_ids = list(users.values_list("pk", flat=True))
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset : offset + batch_size]
+        activities = {user_id: UserActivity(user_id=user_id) for user_id in batch}
+        counts = (
+            Bid.objects.filter(user__in=batch)
+            .values_list("user")
+            .annotate(count=Count("id"))
+        )
+        for user_id, count in counts:
+            activities[user_id].bid_count = count
+        # Each listing the user bid on once, ordered by their last bid on it
+        bid_listings = (
+            Bid.objects.filter(user__in=batch)
+            .values_list(
+                "user",
+                "listing",
+                "listing__active",
+                "listing__high_bidder",
+                "listing__winner",
+            )
+            .annotate(last=Max("id"))
+        )
+        # (user id, listing id): (last bid id, active, high bidder id, winner id)
+        entries = {
+            (user_id, listing_id): (last, active, high_bidder_id, winner_id)
+            for user_id, listing_id, active, high_bidder_id, winner_id, last in (
+                bid_listings
+            )
+        }
+        # Bids moved out by `archive_bids`, all on listings that have closed
+        archived = ArchivedBidder.objects.filter(user__in=batch).values_list(
+            "user", "archive", "bid_count", "last_bid", "archive__listing__winner"
+        )
+        for user_id, listing_id, count, last_bid, winner_id in archived:
+            activities[user_id].bid_count += count
+            last = entries.get((user_id, listing_id), (last_bid,))[0]
+            entries[user_id, listing_id] = (max(last, last_bid), False, None, winner_id)
+        for (user_id, listing_id), (_, active, high_bidder_id, winner_id) in sorted(
+            entries.items(), key=lambda item: item[1][0]
+        ):
+            if active:
+                target = "winning" if high_bidder_id == user_id else "outbid"
+            else:
+                target = "won" if winner_id == user_id else "lost"
+            getattr(activities[user_id], target).append(listing_id)
+        own = Listing.objects.filter(user__in=batch).order_by("id")
+        for user_id, listing_id in own.values_list("user", "id"):
+            activities[user_id].listings.append(listing_id)
+        with transaction.atomic():
+            UserActivity.objects.filter(pk__in=batch).delete()
+            UserActivity.objects.bulk_create(activities.values())
+    return len(user_ids)
@@ -1,11 +1,40 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Bid, Category, Comment, Listing, User
+from .closing import close_listings
+from .models import (
+    BID_FIELDS,
+    ArchivedBidder,
+    Bid,
+    BidArchive,
+    Category,
+    Comment,
+    Listing,
+    MaxBid,
+    User,
+    UserActivity,
+)
 
 # Register your models here.
 admin.site.register(User)
 admin.site.register(Bid)
+admin.site.register(BidArchive)
+admin.site.register(ArchivedBidder)
 admin.site.register(Category)
 admin.site.register(Comment)
-admin.site.register(Listing)
+admin.site.register(MaxBid)
+admin.site.register(UserActivity)
+
+
+@admin.register(Listing)
+class ListingAdmin(admin.ModelAdmin):
+    # Bids maintain these; `recompute_listing_stats` rebuilds them from the bids.
+    # Closing also records the winner and the bidders' activity, so it goes
+    # through the "close" action rather than the active flag
+    readonly_fields = (*BID_FIELDS, "version", "active", "winner", "closed_at")
+    actions = ["close"]
+
+    @admin.action(description="Close selected listings")
+    def close(self, request, queryset):
+        closed = close_listings(list(queryset.values_list("pk", flat=True)))
+        self.message_user(request, f"{closed} listing(s) closed.")
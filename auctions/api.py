@@ -0,0 +1,215 @@
+"""Versioned JSON read API for listings and categories, mounted at `api/v1/`.
+
+Rows are serialized straight from `.values()`, so no model instances are built,
+and `?fields=` selects a sparse fieldset from `LISTING_FIELDS` so that only those
+columns (and only the joins they need) are queried. The listing feed takes the
+filters of the HTML index and pages by the same keyset cursors; `?ids=` fetches
+up to `AUCTIONS_MAX_PAGE_SIZE` listings in one request instead.
+
+`POST api/v1/bids` places a batch of bids for automated bidders; see `bids()`.
+The API authenticates with the session cookie of a logged-in user, so its `POST`
+requests pass Django's CSRF check: every API response sets the `csrftoken`
+cookie, and a client echoes its value in the `X-CSRFToken` header.
+"""
+
+import json
+from functools import wraps
+
+from django import forms
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpRequest, JsonResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_POST, require_safe
+
+from .bidding import place_bid_batch
+from .models import Bid, Category, Listing
+from .pagination import paginate
+from .views import ListingFilterForm
+
+# Public field name: ORM path
+LISTING_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "description": "description",
+    "price": "current_price",
+    "starting_price": "starting_price",
+    "bid_count": "bid_count",
+    "high_bidder": "high_bidder__username",
+    "seller": "user__username",
+    "category": "category",
+    "image_url": "image_url",
+    "active": "active",
+    "created": "created",
+    "updated": "updated",
+    "ends_at": "ends_at",
+    "closed_at": "closed_at",
+    "winner": "winner__username",
+}
+DEFAULT_FIELDS = ["id", "title", "price", "bid_count", "active", "ends_at"]
+# Status of a batch bid that is malformed, next to those of `bidding`
+INVALID = "invalid"
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """Answer with JSON errors instead of login redirects and HTML error pages.
+
+    Responses also set the CSRF cookie, so a client can fetch its token from any
+    API call before its first `POST`.
+    """
+
+    @ensure_csrf_cookie
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required."}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({"error": str(error)}, status=error.status)
+
+    return wrapper
+
+
+def requested_fields(request: HttpRequest) -> list[str]:
+    """Return the fields named by `?fields=`, or the default fieldset."""
+    if not request.GET.get("fields"):
+        return DEFAULT_FIELDS
+    fields = list(dict.fromkeys(request.GET["fields"].split(",")))
+    unknown = [name for name in fields if name not in LISTING_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def listing_values(
+    listings: QuerySet, fields: list[str], extra: tuple = ()
+) -> QuerySet:
+    """Select the ORM paths of `fields`, plus the model fields `extra`."""
+    paths = [LISTING_FIELDS[name] for name in fields]
+    return listings.values(*dict.fromkeys([*paths, *extra]))
+
+
+def serialize(rows, fields: list[str]) -> list[dict]:
+    """Rename `.values()` rows to the public field names, dropping other keys."""
+    paths = [(name, LISTING_FIELDS[name]) for name in fields]
+    return [{name: row[path] for name, path in paths} for row in rows]
+
+
+@api_view
+@require_safe
+def categories(request: HttpRequest) -> JsonResponse:
+    """List every category with its number of active listings."""
+    rows = Category.objects.order_by("name").values(
+        "id", "name", "image_url", "active_listing_count"
+    )
+    return JsonResponse({"results": list(rows)})
+
+
+@api_view
+@require_safe
+def listing(request: HttpRequest, listing_id: int) -> JsonResponse:
+    """Return one listing."""
+    fields = requested_fields(request)
+    row = listing_values(Listing.objects.filter(pk=listing_id), fields).first()
+    if row is None:
+        raise ApiError("Listing not found.", status=404)
+    return JsonResponse(serialize([row], fields)[0])
+
+
+@api_view
+@require_safe
+def listings(request: HttpRequest) -> JsonResponse:
+    """Return a page of the filtered feed, or the listings named by `?ids=`."""
+    fields = requested_fields(request)
+    if "ids" in request.GET:
+        return bulk_listings(request, fields)
+    filter_form = ListingFilterForm(request.GET)
+    queryset, ordering = filter_form.filter(Listing.objects.all())
+    extra = tuple(name.lstrip("-") for name in ordering)
+    page = paginate(request, listing_values(queryset, fields, extra), ordering)
+    return JsonResponse(
+        {
+            "results": serialize(page.items, fields),
+            "next": f"{request.path}?{page.next_query}" if page.next_query else None,
+        }
+    )
+
+
+def bulk_listings(request: HttpRequest, fields: list[str]) -> JsonResponse:
+    try:
+        ids = [int(value) for value in request.GET["ids"].split(",") if value]
+    except ValueError:
+        raise ApiError("`ids` must be a comma-separated list of integers.")
+    if len(ids) > settings.AUCTIONS_MAX_PAGE_SIZE:
+        raise ApiError(f"At most {settings.AUCTIONS_MAX_PAGE_SIZE} ids per request.")
+    rows = listing_values(Listing.objects.filter(pk__in=ids), fields, ("id",))
+    by_id = {row["id"]: row for row in rows}
+    # In the requested order; ids that do not exist are left out
+    found = [
+        by_id[listing_id] for listing_id in dict.fromkeys(ids) if listing_id in by_id
+    ]
+    return JsonResponse({"results": serialize(found, fields)})
+
+
+class BatchBidForm(forms.Form):
+    """One bid of a batch."""
+
+    listing = forms.IntegerField()
+    price = Bid._meta.get_field("price").formfield()
+
+
+@api_view
+@require_POST
+def bids(request: HttpRequest) -> JsonResponse:
+    """Place a batch of bids across any number of listings.
+
+    The body is `{"bids": [{"listing": 1, "price": "7.50"}, ...]}` with up to
+    `AUCTIONS_BID_BATCH_SIZE` bids. Every bid gets a result, in the same order,
+    with its status, the listing's current price and the new bid's id if accepted.
+    """
+    try:
+        items = json.loads(request.body)["bids"]
+    except (ValueError, TypeError, KeyError):
+        items = None
+    if not isinstance(items, list):
+        raise ApiError('The body must be JSON of the form {"bids": [...]}.')
+    if len(items) > settings.AUCTIONS_BID_BATCH_SIZE:
+        raise ApiError(f"At most {settings.AUCTIONS_BID_BATCH_SIZE} bids per request.")
+    bid_forms = [BatchBidForm(item if isinstance(item, dict) else {}) for item in items]
+    placed = iter(
+        place_bid_batch(
+            request.user,
+            [
+                (form.cleaned_data["listing"], form.cleaned_data["price"])
+                for form in bid_forms
+                if form.is_valid()
+            ],
+        )
+    )
+    results = []
+    for form in bid_forms:
+        if not form.is_valid():
+            message = " ".join(
+                f"{field}: {error}"
+                for field, errors in form.errors.items()
+                for error in errors
+            )
+            results.append({"status": INVALID, "message": message})
+            continue
+        result = next(placed)
+        results.append(
+            {
+                "status": result.status,
+                "price": result.price,
+                "bid": result.bid.pk if result.bid else None,
+                "message": result.message,
+            }
+        )
+    return JsonResponse({"results": results})
@@ -0,0 +1,100 @@
+"""Archival of the bids of long-closed listings.
+
+Closed listings take no more bids, but their rows would stay in `Bid` forever.
+`archive_closed_listings()` moves every bid of a listing closed for a while into
+one compressed `BidArchive` row, keeping only the winning bid in `Bid`, so the hot
+table and its indexes only grow with live auctions. The winning bid keeps the
+listing page, `Listing.highest_bid()` and the price recompute correct;
+`recompute_listing_stats` adds the archived bids to the bid counts. Each
+archive's bidders are also recorded in `ArchivedBidder`, so the activity
+summaries can be rebuilt by user without decoding archives.
+"""
+
+import json
+import zlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedBidder, Bid, BidArchive, Listing
+
+
+def compress(rows: list[list]) -> bytes:
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 9)
+
+
+def bidders(rows: list[list]) -> dict[int, tuple[int, int]]:
+    """Return `{user id: (bid count, last bid id)}` for archived bid `rows`."""
+    result = {}
+    for bid_id, user_id, _, _ in rows:
+        count, last = result.get(user_id, (0, 0))
+        result[user_id] = (count + 1, max(last, bid_id))
+    return result
+
+
+def archive_closed_listings(days: int, batch_size: int = 500) -> tuple[int, int, int]:
+    """Archive the bids of listings closed more than `days` ago, a batch at a time.
+
+    Return how many listings and bids were archived and the compressed size in
+    bytes. Each batch is its own transaction: the bids are read in the order of
+    `bid_listing_price_idx`, the first of each listing is kept and the others are
+    written to one `BidArchive` row per listing and deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    listings = bids = size = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Listing.objects.filter(
+                    active=False,
+                    closed_at__lte=cutoff,
+                    bid_count__gt=1,
+                    bid_archive__isnull=True,
+                )
+                .order_by("closed_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not batch:
+                return listings, bids, size
+            rows = {listing_id: [] for listing_id in batch}
+            kept = []
+            for bid_id, listing_id, user_id, price, placed in (
+                Bid.objects.filter(listing__in=batch)
+                .order_by("listing", "-price", "placed")
+                .values_list("id", "listing", "user", "price", "placed")
+            ):
+                if not kept or kept[-1][1] != listing_id:
+                    # The winning bid, as `Listing.highest_bid()` picks it
+                    kept.append((bid_id, listing_id))
+                    continue
+                rows[listing_id].append(
+                    [bid_id, user_id, str(price), placed.isoformat()]
+                )
+            archives = [
+                # Oldest first, as the bids were placed
+                BidArchive(
+                    listing_id=listing_id,
+                    bid_count=len(archived),
+                    data=compress(sorted(archived)),
+                )
+                for listing_id, archived in rows.items()
+            ]
+            BidArchive.objects.bulk_create(archives)
+            ArchivedBidder.objects.bulk_create(
+                ArchivedBidder(
+                    archive_id=listing_id,
+                    user_id=user_id,
+                    bid_count=count,
+                    last_bid=last,
+                )
+                for listing_id, archived in rows.items()
+                for user_id, (count, last) in bidders(archived).items()
+            )
+            bids += (
+                Bid.objects.filter(listing__in=batch)
+                .exclude(pk__in=[bid_id for bid_id, _ in kept])
+                .delete()[0]
+            )
+            listings += len(batch)
+            size += sum(len(archive.data) for archive in archives)
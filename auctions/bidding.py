@@ -0,0 +1,326 @@
+"""Bid placement for the auctions app.
+
+Every accepted bid goes through `place_bids()`, which keeps the denormalized price
+columns on `Listing` consistent with the `Bid` table under concurrent bidding,
+and lets the maximum bids of `proxy.py` answer every new bid in the same
+transaction.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import activity
+from .events import publish_listing
+from .models import Bid, Listing, MaxBid, User
+from .proxy import Proxy, resolve
+
+ACCEPTED = "accepted"
+CLOSED = "closed"
+NOT_FOUND = "not_found"
+OWN_LISTING = "own_listing"
+TOO_LOW = "too_low"
+BUSY = "busy"
+# The bid was placed, but another bidder's maximum bid outbid it straight away
+OUTBID = "outbid"
+
+
+@dataclass(frozen=True)
+class BidResult:
+    """The outcome of a bid, with the listing's current price after the attempt."""
+
+    status: str
+    price: Decimal | None = None
+    bid: Bid | None = None
+    message: str = ""
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == ACCEPTED
+
+
+class _Conflict(Exception):
+    """Another bid changed the listing between our read and our write."""
+
+
+def check_bid(listing: Listing, user: User, price: Decimal) -> BidResult | None:
+    """Return the rejection for `price` on `listing`, or `None` if it is acceptable."""
+    current = listing.current_price
+    if not listing.active or (listing.ends_at and listing.ends_at <= timezone.now()):
+        return BidResult(CLOSED, current, message="This listing is closed.")
+    # The listing page never offers sellers a bid form; this holds for direct POSTs
+    if listing.user_id == user.pk:
+        return BidResult(
+            OWN_LISTING, current, message="You cannot bid on your own listing."
+        )
+    if listing.bid_count and price <= current:
+        return BidResult(
+            TOO_LOW,
+            current,
+            message=f"Your bid must be higher than the current price (${current}).",
+        )
+    if not listing.bid_count and price < current:
+        return BidResult(
+            TOO_LOW,
+            current,
+            message="Your bid must be higher than or equal to the starting price "
+            f"(${current}).",
+        )
+    return None
+
+
+# Fields `check_bid()` and the proxy bidding read
+CHECK_FIELDS = (
+    "user",
+    "active",
+    "ends_at",
+    "current_price",
+    "bid_count",
+    "high_bidder",
+)
+
+
+def _lock_listing(listing_id: int) -> Listing | None:
+    # Row lock where the database supports it (PostgreSQL)...
+    return (
+        Listing.objects.select_for_update()
+        .only(*CHECK_FIELDS)
+        .filter(pk=listing_id)
+        .first()
+    )
+
+
+def _load_proxies(listing: Listing) -> tuple[list[Proxy], dict[int, User]]:
+    """Return the maximums that can still bid on `listing`, earliest first."""
+    max_bids = (
+        MaxBid.objects.filter(listing=listing.pk, amount__gte=listing.current_price)
+        .select_related("user")
+        .order_by("placed", "id")
+    )
+    proxies = [Proxy(max_bid.user_id, max_bid.amount) for max_bid in max_bids]
+    return proxies, {max_bid.user_id: max_bid.user for max_bid in max_bids}
+
+
+def _add_bid(listing: Listing, user_id: int, price: Decimal, bids: list) -> Bid:
+    bid = Bid(user_id=user_id, listing=listing, price=price)
+    bids.append(bid)
+    listing.current_price = price
+    listing.bid_count += 1
+    listing.high_bidder_id = user_id
+    return bid
+
+
+def _bid_by_proxies(listing: Listing, proxies: list[Proxy], bids: list) -> None:
+    for user_id, price in resolve(
+        listing.current_price,
+        listing.bid_count,
+        listing.high_bidder_id,
+        proxies,
+        settings.AUCTIONS_BID_INCREMENT,
+    ):
+        _add_bid(listing, user_id, price, bids)
+
+
+def _save_bids(
+    listing: Listing,
+    bid_count: int,
+    leader_id: int | None,
+    bids: list[Bid],
+    users: dict[int, User],
+) -> None:
+    """Write `bids` and the new state of `listing`.
+
+    `bid_count` and `leader_id` are the listing's as it was read, before `bids`.
+    """
+    Bid.objects.bulk_create(bids)
+    # ...and a compare-and-swap on the bid count where it doesn't (SQLite), which
+    # also catches changes since a listing passed in by the caller was read
+    swapped = Listing.objects.filter(
+        pk=listing.pk, bid_count=bid_count, active=True
+    ).update(
+        current_price=listing.current_price,
+        high_bidder=listing.high_bidder_id,
+        bid_count=F("bid_count") + len(bids),
+        version=F("version") + 1,
+        updated=timezone.now(),
+    )
+    if not swapped:
+        raise _Conflict
+    activity.record_bids(listing.pk, bids, leader_id, listing.high_bidder_id)
+    publish_listing(
+        listing.pk,
+        "bid",
+        price=f"{listing.current_price:.2f}",
+        bid_count=listing.bid_count,
+        high_bidder=users[listing.high_bidder_id].username,
+    )
+
+
+def _outbid(listing: Listing, bid: Bid | None) -> BidResult:
+    return BidResult(
+        OUTBID,
+        listing.current_price,
+        bid=bid,
+        message="You were outbid by another bidder's maximum bid "
+        f"(${listing.current_price}).",
+    )
+
+
+def _place_once(
+    listing_id: int, user: User, prices: list[Decimal], listing: Listing | None
+) -> list[BidResult]:
+    with transaction.atomic():
+        if listing is None:
+            listing = _lock_listing(listing_id)
+        if listing is None:
+            return [
+                BidResult(NOT_FOUND, message="This listing does not exist.")
+                for _ in prices
+            ]
+        bid_count, leader_id = listing.bid_count, listing.high_bidder_id
+        proxies = None
+        results = []
+        bids = []
+        for price in prices:
+            rejection = check_bid(listing, user, price)
+            if rejection:
+                results.append(rejection)
+                continue
+            if proxies is None:
+                proxies, users = _load_proxies(listing)
+                users[user.pk] = user
+            bid = _add_bid(listing, user.pk, price, bids)
+            # Maximums registered by others answer the bid straight away; later
+            # prices in the batch have to beat the outcome
+            _bid_by_proxies(listing, proxies, bids)
+            if listing.high_bidder_id == user.pk:
+                results.append(BidResult(ACCEPTED, listing.current_price, bid=bid))
+            else:
+                results.append(_outbid(listing, bid))
+        if bids:
+            _save_bids(listing, bid_count, leader_id, bids, users)
+    return results
+
+
+def _set_max_once(listing_id: int, user: User, amount: Decimal) -> BidResult:
+    with transaction.atomic():
+        listing = _lock_listing(listing_id)
+        if listing is None:
+            return BidResult(NOT_FOUND, message="This listing does not exist.")
+        rejection = check_bid(listing, user, amount)
+        if rejection:
+            return rejection
+        MaxBid.objects.update_or_create(
+            listing=listing, user=user, defaults={"amount": amount}
+        )
+        proxies, users = _load_proxies(listing)
+        bid_count, leader_id = listing.bid_count, listing.high_bidder_id
+        bids = []
+        _bid_by_proxies(listing, proxies, bids)
+        if bids:
+            _save_bids(listing, bid_count, leader_id, bids, users)
+    own = [bid for bid in bids if bid.user_id == user.pk]
+    bid = own[-1] if own else None
+    if listing.high_bidder_id == user.pk:
+        return BidResult(ACCEPTED, listing.current_price, bid=bid)
+    return _outbid(listing, bid)
+
+
+def _retry(place, retries: int | None):
+    """Return `place(attempt)`, retried while other bids win the race, or `None`.
+
+    The transaction is rolled back and retried with jittered backoff up to
+    `retries` times (default `AUCTIONS_BID_RETRIES`) before giving up as busy.
+    """
+    if retries is None:
+        retries = settings.AUCTIONS_BID_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            return place(attempt)
+        except (_Conflict, OperationalError):
+            if attempt < retries:
+                time.sleep(random.uniform(0, 0.005 * 2**attempt))
+    return None
+
+
+def _busy() -> BidResult:
+    return BidResult(BUSY, message="The listing is busy, please try again.")
+
+
+def place_bids(
+    listing_id: int,
+    user: User,
+    prices: list[Decimal],
+    retries: int | None = None,
+    listing: Listing | None = None,
+) -> list[BidResult]:
+    """Place bids of `prices`, in order, by `user` on one listing.
+
+    The checks and the writes happen in one transaction, and each accepted price
+    has to beat the ones before it and whatever the other bidders' maximums bid
+    in answer. A `listing` already read with `CHECK_FIELDS` saves the read on the
+    first attempt; see `_retry()` for losing a race with another bid.
+    """
+    results = _retry(
+        lambda attempt: _place_once(
+            listing_id, user, prices, listing if attempt == 0 else None
+        ),
+        retries,
+    )
+    return results if results is not None else [_busy() for _ in prices]
+
+
+def place_bid(
+    listing_id: int, user: User, price: Decimal, retries: int | None = None
+) -> BidResult:
+    """Place a bid of `price` by `user` and return whether it was accepted."""
+    return place_bids(listing_id, user, [price], retries)[0]
+
+
+def set_max_bid(
+    listing_id: int, user: User, amount: Decimal, retries: int | None = None
+) -> BidResult:
+    """Register `amount` as the most `user` will bid, and bid for them up to it.
+
+    The amount has to be a valid bid itself. The result is accepted when the user
+    leads afterwards, at the price the maximums settled on, and `OUTBID` when
+    another bidder's maximum is higher.
+    """
+    result = _retry(lambda attempt: _set_max_once(listing_id, user, amount), retries)
+    return result or _busy()
+
+
+def place_bid_batch(user: User, bids: list[tuple[int, Decimal]]) -> list[BidResult]:
+    """Place `(listing id, price)` bids by `user` across many listings.
+
+    All the referenced listings are read in one query, so bids that are already
+    too low or on closed listings are rejected without touching the database
+    again. The rest are applied per listing, each in its own transaction, so a
+    busy listing does not hold back the others. Results follow the order of `bids`.
+    """
+    listings = Listing.objects.only(*CHECK_FIELDS).in_bulk(
+        {listing_id for listing_id, _ in bids}
+    )
+    indexes = {}
+    for index, (listing_id, _) in enumerate(bids):
+        indexes.setdefault(listing_id, []).append(index)
+    results = [None] * len(bids)
+    for listing_id, group in indexes.items():
+        prices = [bids[index][1] for index in group]
+        listing = listings.get(listing_id)
+        if listing is None:
+            group_results = [
+                BidResult(NOT_FOUND, message="This listing does not exist.")
+                for _ in prices
+            ]
+        else:
+            group_results = place_bids(listing_id, user, prices, listing=listing)
+        for index, result in zip(group, group_results):
+            results[index] = result
+    return results
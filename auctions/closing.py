@@ -0,0 +1,72 @@
+"""Closing auctions, either by their owner or when their scheduled end passes."""
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import activity
+from .events import publish_listing
+from .models import Category, Listing
+
+
+def close_listings(listing_ids: list[int]) -> int:
+    """Close the given listings, record their winners and return how many closed.
+
+    The listings are closed with one `UPDATE`, which skips the model signals, so
+    the category counters and the bidders' activity are adjusted here from the
+    locked rows instead.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Listing.objects.filter(pk__in=listing_ids)
+            .active()
+            .select_for_update()
+            .values_list("id", "category", "high_bidder")
+        )
+        closing = [listing_id for listing_id, _, _ in rows]
+        closed = Listing.objects.filter(pk__in=closing).update(
+            active=False,
+            closed_at=now,
+            winner=F("high_bidder"),
+            version=F("version") + 1,
+            updated=now,
+        )
+        per_category = Counter(category for _, category, _ in rows if category)
+        for category_id, count in per_category.items():
+            Category.objects.filter(pk=category_id).update(
+                active_listing_count=Greatest(F("active_listing_count") - count, 0)
+            )
+        activity.record_closed(
+            {listing_id: high_bidder for listing_id, _, high_bidder in rows}
+        )
+        for listing_id in closing:
+            publish_listing(listing_id, "closed")
+    return closed
+
+
+def close_expired_listings(batch_size: int = 1000) -> int:
+    """Close every active listing whose `ends_at` has passed, a batch at a time.
+
+    Each batch is its own short transaction, so the listing table is never
+    locked for long. On PostgreSQL due rows already locked by another sweeper
+    are skipped, so several workers can share the backlog.
+    """
+    now = timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            due = (
+                Listing.objects.active()
+                .filter(ends_at__lte=now)
+                .order_by("ends_at", "id")
+            )
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            batch = list(due.values_list("id", flat=True)[:batch_size])
+            if not batch:
+                return total
+            total += close_listings(batch)
@@ -0,0 +1,75 @@
+"""Conditional GET validators for the listing page and the listing feeds.
+
+The pages are validated by `Listing.updated`, which edits, bids, comments,
+closing and watchlist changes all bump: a single listing's timestamp for its
+page and the latest timestamp of any listing for the feeds. A request whose
+`If-None-Match` or `If-Modified-Since` still matches gets `304 Not Modified`
+before the view runs any other query or renders a template.
+
+The ETag also covers the user, the CSRF cookie (pages embed a token derived from
+it) and the full path with its filters and cursor. `Last-Modified` has one
+second resolution, so the ETag is the exact validator; browsers send both and
+the ETag then takes precedence.
+"""
+
+import hashlib
+from datetime import datetime
+
+from django.db.models import Max
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from .models import Listing
+
+
+def _memoized(request: HttpRequest, compute) -> datetime | None:
+    # `condition` asks for the ETag and then Last-Modified; query only once
+    if not hasattr(request, "_listing_updated"):
+        request._listing_updated = compute()
+    return request._listing_updated
+
+
+def listing_updated(request: HttpRequest, listing_id: int) -> datetime | None:
+    """Return when the listing last changed, or `None` if it does not exist."""
+    return _memoized(
+        request,
+        lambda: Listing.objects.filter(pk=listing_id)
+        .values_list("updated", flat=True)
+        .first(),
+    )
+
+
+def feed_updated(request: HttpRequest, *args, **kwargs) -> datetime | None:
+    """Return when any listing last changed, read from `listing_updated_idx`."""
+    return _memoized(
+        request, lambda: Listing.objects.aggregate(updated=Max("updated"))["updated"]
+    )
+
+
+def etag(request: HttpRequest, updated: datetime | None) -> str | None:
+    """Return the ETag of the page `request` gets as of `updated`."""
+    if updated is None:
+        return None
+    # Make sure the CSRF secret exists now, as rendering would create it anyway
+    get_token(request)
+    parts = [
+        updated.isoformat(),
+        str(request.user.pk),
+        request.META["CSRF_COOKIE"],
+        request.get_full_path(),
+    ]
+    return hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+listing_condition = condition(
+    etag_func=lambda request, listing_id: etag(
+        request, listing_updated(request, listing_id)
+    ),
+    last_modified_func=listing_updated,
+)
+
+feed_condition = condition(
+    etag_func=lambda request, *args, **kwargs: etag(request, feed_updated(request)),
+    last_modified_func=feed_updated,
+)
@@ -0,0 +1,21 @@
+"""Template context processors for the auctions app."""
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+
+def listing_cards(request: HttpRequest) -> dict:
+    """Expose how long rendered listing cards stay in the fragment cache."""
+    return {"card_cache_timeout": settings.AUCTIONS_CARD_CACHE_TIMEOUT}
+
+
+def watchlist(request: HttpRequest) -> dict:
+    """Expose the ids of the user's watched listings, loaded on first use."""
+
+    def watched_ids() -> frozenset[int]:
+        if not request.user.is_authenticated:
+            return frozenset()
+        return request.user.watched_listing_ids()
+
+    return {"watched_ids": SimpleLazyObject(watched_ids)}
@@ -0,0 +1,105 @@
+"""Publish/subscribe of listing updates for the live bid stream.
+
+The broker is chosen with the `AUCTIONS_EVENT_BROKER` setting. The default
+`InProcessBroker` only reaches subscribers in the same process, which suits a
+single ASGI worker; a broker for several workers (for example one backed by
+Redis pub/sub) needs the same two methods:
+
+* `publish(channel, message)`, callable from any thread, and
+* `listen(channel, heartbeat)`, called from the event loop, which subscribes at
+  once and returns an async iterator of messages that yields `None` whenever
+  `heartbeat` seconds pass without one and unsubscribes on `aclose()`.
+
+Streams are only served by the ASGI application: under WSGI each open stream
+would hold a worker thread for as long as the page stays open.
+"""
+
+import asyncio
+import threading
+from functools import cache
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Only the latest state of a listing matters, so slow clients drop old messages
+QUEUE_SIZE = 16
+
+
+class InProcessBroker:
+    """Fan messages out to the asyncio queues of this process's subscribers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set] = {}
+
+    def publish(self, channel: str, message: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: dict) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    def listen(self, channel: str, heartbeat: float) -> "Subscription":
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return Subscription(self, channel, subscriber, heartbeat)
+
+    def _unsubscribe(self, channel: str, subscriber: tuple) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(channel, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+
+class Subscription:
+    """The messages of one `InProcessBroker` subscriber, until `aclose()`."""
+
+    def __init__(self, broker, channel, subscriber, heartbeat):
+        self._broker = broker
+        self._channel = channel
+        self._subscriber = subscriber
+        self._heartbeat = heartbeat
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> dict | None:
+        try:
+            return await asyncio.wait_for(self._subscriber[1].get(), self._heartbeat)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self) -> None:
+        self._broker._unsubscribe(self._channel, self._subscriber)
+
+
+def supports_streaming(request) -> bool:
+    """Whether `request` is served by the ASGI application, which can hold streams."""
+    return isinstance(request, ASGIRequest)
+
+
+@cache
+def get_broker():
+    """Return the process-wide broker configured by `AUCTIONS_EVENT_BROKER`."""
+    return import_string(settings.AUCTIONS_EVENT_BROKER)()
+
+
+def listing_channel(listing_id: int) -> str:
+    return f"listing:{listing_id}"
+
+
+def publish_listing(listing_id: int, event: str, **data) -> None:
+    """Publish an update of a listing once the current transaction commits."""
+    message = {"event": event, "listing": listing_id, **data}
+    transaction.on_commit(
+        lambda: get_broker().publish(listing_channel(listing_id), message)
+    )
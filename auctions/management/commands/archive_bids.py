@@ -0,0 +1,36 @@
+# auctions/management/commands/archive_bids.py
+
+from django.core.management.base import BaseCommand
+
+from auctions.archive import archive_closed_listings
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the bids of long-closed listings into compressed archive rows, "
+        "keeping each winning bid"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Archive listings closed more than this many days ago (default: 90)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Listings archived per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        listings, bids, size = archive_closed_listings(
+            options["days"], options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {bids} bid(s) of {listings} listing(s) archived in {size} bytes"
+            )
+        )
@@ -0,0 +1,274 @@
+# auctions/management/commands/benchmark.py
+
+import http.cookiejar
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from auctions.models import Listing
+
+User = get_user_model()
+
+SCENARIOS = ["index", "listing", "bid", "watchlist", "bid_batch"]
+
+
+class TestClientSession:
+    """Requests sent in-process through Django's test client."""
+
+    def __init__(self, user):
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+
+    def get(self, path: str) -> int:
+        return self.client.get(path).status_code
+
+    def post(self, path: str, data: dict) -> int:
+        return self.client.post(path, data).status_code
+
+    def post_json(self, path: str, data: dict) -> int:
+        return self.client.post(path, data, content_type="application/json").status_code
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """Requests sent over HTTP to a running server, logged in with a password."""
+
+    def __init__(self, base_url: str, username: str, password: str):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect
+        )
+        self.get("/login")
+        if self.post("/login", {"username": username, "password": password}) != 302:
+            raise CommandError(f"Could not log in to {base_url} as {username}.")
+
+    def request(self, path: str, data: dict | None = None, as_json=False) -> int:
+        headers = {"Referer": self.base_url + path}
+        body = None
+        if data is not None:
+            token = next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+            if as_json:
+                headers.update(
+                    {"Content-Type": "application/json", "X-CSRFToken": token}
+                )
+                body = json.dumps(data)
+            else:
+                body = urllib.parse.urlencode({**data, "csrfmiddlewaretoken": token})
+            body = body.encode()
+        request = urllib.request.Request(self.base_url + path, body, headers)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+        except OSError:
+            return 599
+
+    def get(self, path: str) -> int:
+        return self.request(path)
+
+    def post(self, path: str, data: dict) -> int:
+        return self.request(path, data)
+
+    def post_json(self, path: str, data: dict) -> int:
+        return self.request(path, data, as_json=True)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the main views and reports latency percentiles and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Benchmark a running server over HTTP instead of the test client",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--username", default="alice")
+        parser.add_argument("--password", default="testpass")
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(SCENARIOS),
+            help=f"Comma-separated subset of {', '.join(SCENARIOS)}",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Bids per request in the bid_batch scenario",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--save", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="Compare with this results JSON file")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="Fail if any p95 is this many percent slower than the baseline",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"].split(",")
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user {options['username']}; run `seed` first.")
+        # Listings the user may bid on, with the price to outbid
+        self.prices = dict(
+            Listing.objects.active()
+            .exclude(user=user)
+            .values_list("id", "current_price")[:1000]
+        )
+        if not self.prices:
+            raise CommandError("No listings to benchmark; run `seed` first.")
+        self.batch_size = options["batch_size"]
+        self.lock = threading.Lock()
+        if options["url"]:
+            self.new_session = lambda: HttpSession(
+                options["url"], options["username"], options["password"]
+            )
+        else:
+            self.new_session = lambda: TestClientSession(user)
+        results = {
+            "mode": "http" if options["url"] else "client",
+            "threads": options["threads"],
+            "scenarios": {
+                scenario: self.run(
+                    scenario, options["requests"], options["threads"], options["seed"]
+                )
+                for scenario in scenarios
+            },
+        }
+        self.report(results["scenarios"])
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(results, file, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            self.compare(
+                baseline["scenarios"], results["scenarios"], options["max_regression"]
+            )
+
+    def run(self, scenario: str, requests: int, threads: int, seed: int) -> dict:
+        timings = []
+        errors = 0
+
+        def worker(index: int, count: int) -> None:
+            nonlocal errors
+            rng = random.Random(f"{seed}-{scenario}-{index}")
+            try:
+                session = self.new_session()
+                for _ in range(count):
+                    path, data = self.next_request(scenario, rng)
+                    started = time.perf_counter()
+                    if data is None:
+                        status = session.get(path)
+                    elif scenario == "bid_batch":
+                        status = session.post_json(path, data)
+                    else:
+                        status = session.post(path, data)
+                    elapsed = time.perf_counter() - started
+                    with self.lock:
+                        timings.append(elapsed * 1000)
+                        errors += status >= 400
+            finally:
+                connection.close()
+
+        shares = [
+            requests // threads + (i < requests % threads) for i in range(threads)
+        ]
+        workers = [
+            threading.Thread(target=worker, args=(i, share))
+            for i, share in enumerate(shares)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else []
+        return {
+            "requests": len(timings),
+            "errors": errors,
+            "p50_ms": round(quantiles[49], 2) if quantiles else None,
+            "p95_ms": round(quantiles[94], 2) if quantiles else None,
+            "p99_ms": round(quantiles[98], 2) if quantiles else None,
+            "throughput_rps": round(len(timings) / elapsed, 1),
+        }
+
+    def next_request(self, scenario: str, rng: random.Random):
+        """Return the path and POST data (or `None`) of the next request."""
+        if scenario == "index":
+            return "/", None
+        if scenario == "watchlist":
+            return "/watchlist", None
+        if scenario == "bid_batch":
+            bids = [
+                {"listing": listing_id, "price": str(self.next_price(listing_id, rng))}
+                for listing_id in rng.choices(list(self.prices), k=self.batch_size)
+            ]
+            return "/api/v1/bids", {"bids": bids}
+        listing_id = rng.choice(list(self.prices))
+        if scenario == "listing":
+            return f"/listing/{listing_id}", None
+        price = self.next_price(listing_id, rng)
+        return f"/listing/{listing_id}", {"price": str(price)}
+
+    def next_price(self, listing_id: int, rng: random.Random) -> Decimal:
+        """Return a price that outbids the last one sent for the listing."""
+        with self.lock:
+            price = self.prices[listing_id] + Decimal(rng.randrange(1, 100)) / 100
+            self.prices[listing_id] = price
+        return price
+
+    def report(self, scenarios: dict) -> None:
+        self.stdout.write(
+            f"{'scenario':<10} {'requests':>8} {'errors':>6} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}"
+        )
+        for name, result in scenarios.items():
+            self.stdout.write(
+                f"{name:<10} {result['requests']:>8} {result['errors']:>6} "
+                f"{result['p50_ms'] or 0:>8.2f} {result['p95_ms'] or 0:>8.2f} "
+                f"{result['p99_ms'] or 0:>8.2f} {result['throughput_rps']:>8.1f}"
+            )
+
+    def compare(self, baseline: dict, current: dict, max_regression) -> None:
+        regressions = []
+        for name, result in current.items():
+            before = baseline.get(name)
+            if not before or not before["p95_ms"] or not result["p95_ms"]:
+                continue
+            change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+            throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+            self.stdout.write(
+                f"{name:<10} p95 {change:+.1f}%  throughput {throughput:+.1f}%"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"p95 regressed by more than {max_regression}% in: "
+                + ", ".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("✅ No regressions beyond the limit"))
@@ -0,0 +1,112 @@
+# auctions/management/commands/benchmark_api.py
+
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from auctions.api import DEFAULT_FIELDS, LISTING_FIELDS, listing_values, serialize
+from auctions.models import Listing
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic listings once the benchmark is done."""
+
+
+def from_instances(fields: list[str]) -> list[dict]:
+    """Serialize listings the way a model-instance serializer would."""
+    listings = Listing.objects.select_related("user", "high_bidder", "winner")
+    # Foreign keys of the listing itself serialize as their id, like `.values()`
+    paths = {
+        name: (
+            [Listing._meta.get_field(path).attname]
+            if "__" not in path
+            else path.split("__")
+        )
+        for name, path in LISTING_FIELDS.items()
+    }
+    rows = []
+    for listing in listings:
+        row = {}
+        for name in fields:
+            value = listing
+            for part in paths[name]:
+                value = None if value is None else getattr(value, part)
+            row[name] = value
+        rows.append(row)
+    return rows
+
+
+def from_values(fields: list[str]) -> list[dict]:
+    return serialize(listing_values(Listing.objects.all(), fields), fields)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the cost per 1,000 listings of serializing API rows from "
+        "`.values()` and from model instances"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            # Everything runs in one transaction that is rolled back at the end
+            with transaction.atomic():
+                self.populate(options["listings"])
+                for label, fields in (
+                    ("default fields", DEFAULT_FIELDS),
+                    ("all fields", list(LISTING_FIELDS)),
+                ):
+                    for name, build in (
+                        ("instances", from_instances),
+                        ("values", from_values),
+                    ):
+                        self.measure(
+                            f"{name}, {label}",
+                            build,
+                            fields,
+                            options["listings"],
+                            options["repeat"],
+                        )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count: int) -> None:
+        seller = User.objects.create_user("benchmark-api-seller")
+        bidder = User.objects.create_user("benchmark-api-bidder")
+        Listing.objects.bulk_create(
+            (
+                Listing(
+                    user=seller,
+                    title=f"Listing {i}",
+                    description="A benchmark listing " * 10,
+                    starting_price=Decimal("10.00"),
+                    current_price=Decimal("12.50"),
+                    high_bidder=bidder,
+                    bid_count=1,
+                )
+                for i in range(count)
+            ),
+            batch_size=2000,
+        )
+
+    def measure(self, label, build, fields, count: int, repeat: int) -> None:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            json.dumps({"results": build(fields)}, cls=DjangoJSONEncoder)
+            timings.append((time.perf_counter() - started) * 1000 * 1000 / count)
+        self.stdout.write(
+            f"{label}: {statistics.median(timings):.2f}ms per 1,000 listings"
+        )
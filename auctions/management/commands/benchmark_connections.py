@@ -0,0 +1,68 @@
+# auctions/management/commands/benchmark_connections.py
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Measures per-request database connection cost with and without reuse"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--queries", type=int, default=3, help="Queries run by each request"
+        )
+
+    def handle(self, *args, **options):
+        configured = connection.settings_dict["CONN_MAX_AGE"]
+        pooled = bool(connection.settings_dict["OPTIONS"].get("pool"))
+        try:
+            # Both runs start without an open connection
+            connection.close()
+            fresh = self.measure(0, options["requests"], options["queries"])
+            connection.close()
+            reused = self.measure(
+                configured or 600, options["requests"], options["queries"]
+            )
+        finally:
+            connection.settings_dict["CONN_MAX_AGE"] = configured
+            connection.close()
+        self.report("new connection per request", fresh)
+        self.report("pooled connections" if pooled else "persistent connection", reused)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Reuse saves {statistics.mean(fresh) - statistics.mean(reused):.2f}ms "
+                "per request"
+            )
+        )
+
+    def measure(self, max_age: int, requests: int, queries: int) -> list[float]:
+        """Time `requests` request cycles with `CONN_MAX_AGE` set to `max_age`.
+
+        The request signals run Django's own `close_old_connections()`, so the
+        connection is closed or kept exactly as it would be by a real request.
+        With a connection pool the connection is always returned to the pool.
+        """
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            for _ in range(queries):
+                list(Listing.objects.active().values_list("id", flat=True)[:1])
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def report(self, label: str, timings: list[float]) -> None:
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f"{label:<28} mean {statistics.mean(timings):.3f}ms, "
+            f"p50 {quantiles[49]:.3f}ms, p95 {quantiles[94]:.3f}ms"
+        )
@@ -0,0 +1,92 @@
+# auctions/management/commands/benchmark_profiles.py
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ["sync", "gthread", "uvicorn"]
+
+
+class Command(BaseCommand):
+    help = "Runs the view benchmark against gunicorn under each server profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            default=",".join(PROFILES),
+            help=f"Comma-separated subset of {', '.join(PROFILES)}",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--workers", type=int, help="Overrides WEB_CONCURRENCY")
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--scenarios", default="index,listing,bid,watchlist")
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile in options["profiles"].split(","):
+            if profile not in PROFILES:
+                raise CommandError(f"Unknown profile {profile!r}")
+            self.stdout.write(f"== {profile}")
+            results[profile] = self.run(profile, options)
+        self.stdout.write(
+            f"{'profile':<9} {'scenario':<10} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'req/s':>8} {'errors':>6}"
+        )
+        for profile, scenarios in results.items():
+            for name, result in scenarios.items():
+                self.stdout.write(
+                    f"{profile:<9} {name:<10} {result['p50_ms'] or 0:>8.2f} "
+                    f"{result['p95_ms'] or 0:>8.2f} {result['throughput_rps']:>8.1f} "
+                    f"{result['errors']:>6}"
+                )
+
+    def run(self, profile: str, options: dict) -> dict:
+        env = {
+            **os.environ,
+            "GUNICORN_PROFILE": profile,
+            "PORT": str(options["port"]),
+        }
+        if options["workers"]:
+            env["WEB_CONCURRENCY"] = str(options["workers"])
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn"],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        try:
+            self.wait_for_port(options["port"], server)
+            with tempfile.NamedTemporaryFile(suffix=".json") as output:
+                call_command(
+                    "benchmark",
+                    url=f"http://127.0.0.1:{options['port']}",
+                    requests=options["requests"],
+                    threads=options["threads"],
+                    scenarios=options["scenarios"],
+                    save=output.name,
+                    stdout=self.stdout,
+                )
+                return json.load(output)["scenarios"]
+        finally:
+            server.terminate()
+            server.wait()
+
+    def wait_for_port(self, port: int, server: subprocess.Popen) -> None:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn exited before it started serving")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("gunicorn did not start serving within 30s")
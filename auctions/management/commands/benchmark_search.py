@@ -0,0 +1,74 @@
+# auctions/management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from auctions.management.commands.seed import WORDS
+from auctions.models import Listing
+from auctions.search import rebuild_index, search
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic listings once the benchmark is done."""
+
+
+class Command(BaseCommand):
+    help = "Measures search latency against a synthetic catalogue of listings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=25)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        try:
+            # Everything runs in one transaction that is rolled back at the end
+            with transaction.atomic():
+                self.populate(rng, options["listings"])
+                self.measure(rng, options["queries"], options["limit"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, rng: random.Random, count: int) -> None:
+        user = User.objects.create_user("benchmark-search")
+        started = time.perf_counter()
+        Listing.objects.bulk_create(
+            (
+                Listing(
+                    user=user,
+                    title=" ".join(rng.sample(WORDS, 3)),
+                    description=" ".join(rng.choices(WORDS, k=20)),
+                )
+                for _ in range(count)
+            ),
+            batch_size=2000,
+        )
+        rebuild_index()
+        self.stdout.write(
+            f"Indexed {count} listings in {time.perf_counter() - started:.1f}s"
+        )
+
+    def measure(self, rng: random.Random, queries: int, limit: int) -> None:
+        timings = []
+        for _ in range(queries):
+            query = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+            started = time.perf_counter()
+            search(query, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {queries} queries: p50 {quantiles[49]:.2f}ms, "
+                f"p95 {quantiles[94]:.2f}ms, p99 {quantiles[98]:.2f}ms"
+            )
+        )
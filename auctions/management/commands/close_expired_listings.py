@@ -0,0 +1,41 @@
+# auctions/management/commands/close_expired_listings.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.closing import close_expired_listings
+
+
+class Command(BaseCommand):
+    help = "Closes active listings whose scheduled end time has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Listings closed per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping as a worker instead of exiting after one pass",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds between sweeps with --loop (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed = close_expired_listings(options["batch_size"])
+            if closed or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"✅ {closed} expired listing(s) closed")
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
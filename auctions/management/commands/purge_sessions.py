@@ -0,0 +1,52 @@
+# auctions/management/commands/purge_sessions.py
+
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Deletes expired sessions from the session table in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Sessions deleted per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to spare the database",
+        )
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, "get_model_class"):
+            # Cache entries expire on their own and signed cookies live on the client
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {settings.SESSION_ENGINE} stores no rows")
+            )
+            return
+        Session = store.get_model_class()
+        now = timezone.now()
+        purged = 0
+        while True:
+            # Short transactions keep the table writable for logins meanwhile
+            with transaction.atomic():
+                keys = list(
+                    Session.objects.filter(expire_date__lt=now).values_list(
+                        "session_key", flat=True
+                    )[: options["batch_size"]]
+                )
+                if not keys:
+                    break
+                purged += Session.objects.filter(session_key__in=keys).delete()[0]
+            time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {purged} expired session(s) purged"))
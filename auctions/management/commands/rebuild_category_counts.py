@@ -0,0 +1,23 @@
+# auctions/management/commands/rebuild_category_counts.py
+
+from django.core.management.base import BaseCommand
+
+from auctions.models import Category
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the cached count of active listings in each category"
+
+    def handle(self, *args, **options):
+        # One grouped aggregate for every category, then write only the drifted ones
+        stale = [
+            category
+            for category in Category.objects.with_active_counts()
+            if category.active_listing_count != category.num_active
+        ]
+        for category in stale:
+            category.active_listing_count = category.num_active
+        Category.objects.bulk_update(stale, ["active_listing_count"], batch_size=500)
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {len(stale)} category count(s) rebuilt")
+        )
@@ -0,0 +1,13 @@
+# auctions/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from auctions.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of listing titles and descriptions"
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} listing(s) indexed"))
@@ -0,0 +1,24 @@
+# auctions/management/commands/rebuild_user_activity.py
+
+from django.core.management.base import BaseCommand
+
+from auctions.activity import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-user activity summaries from the bid and listing tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "user_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild these users (default: all users)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild(options["user_ids"] or None, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {rebuilt} user activity summary(ies) rebuilt")
+        )
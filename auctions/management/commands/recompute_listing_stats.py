@@ -0,0 +1,47 @@
+# auctions/management/commands/recompute_listing_stats.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from auctions.models import Bid, BidArchive, Listing
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized price, high bidder and bid count of listings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "listing_ids",
+            nargs="*",
+            type=int,
+            help="Only repair these listings (default: all listings)",
+        )
+
+    def handle(self, *args, **options):
+        listings = Listing.objects.all()
+        if options["listing_ids"]:
+            listings = listings.filter(pk__in=options["listing_ids"])
+        bids = Bid.objects.filter(listing=OuterRef("pk"))
+        top = bids.order_by("-price", "placed")
+        archived = BidArchive.objects.filter(listing=OuterRef("pk"))
+        # One UPDATE with correlated subqueries, so the repair never loads bids
+        updated = listings.update(
+            # Bids moved out by `archive_bids` still count
+            bid_count=Coalesce(
+                Subquery(
+                    bids.values("listing").annotate(total=Count("pk")).values("total")
+                ),
+                0,
+            )
+            + Coalesce(Subquery(archived.values("bid_count")), 0),
+            current_price=Coalesce(
+                Subquery(top.values("price")[:1]), F("starting_price")
+            ),
+            high_bidder=Subquery(top.values("user")[:1]),
+            # Repaired listings must not be served from caches or as 304s
+            version=F("version") + 1,
+            updated=timezone.now(),
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ {updated} listing(s) recomputed"))
@@ -1,18 +1,67 @@
 # auctions/management/commands/seed.py
 
+import random
+import time
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from auctions.bidding import place_bid
 from auctions.models import Bid, Category, Comment, Listing
 
 User = get_user_model()
 
 
+# Created by `seed_demo()`
+DEMO_USERS = ["alice", "bob", "charlie"]
+CATEGORIES = ["Books", "Collectibles", "Electronics", "Fashion", "Home", "Toys"]
+# Vocabulary of generated titles and descriptions, also used by `benchmark_search`
+WORDS = (
+    "antique bicycle camera desk electric guitar helmet jacket keyboard lamp "
+    "mirror notebook oak piano quilt radio sofa table umbrella vintage watch "
+    "wooden leather brass silver modern classic rare signed handmade"
+).split()
+
+
 class Command(BaseCommand):
     help = "Seeds the database with test users and auction listings"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=0, help="Extra generated users to create"
+        )
+        parser.add_argument(
+            "--listings", type=int, default=0, help="Generated listings to create"
+        )
+        parser.add_argument(
+            "--bids-per-listing",
+            type=int,
+            default=0,
+            help="Bids placed on each generated listing",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed for reproducible data"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows per INSERT"
+        )
+
     def handle(self, *args, **options):
+        self.seed_demo()
+        if options["users"] or options["listings"]:
+            self.seed_generated(
+                random.Random(options["seed"]),
+                options["users"],
+                options["listings"],
+                options["bids_per_listing"],
+                options["batch_size"],
+            )
+
+    def seed_demo(self):
         # Create users
         users = [
             {"username": "alice", "password": "testpass"},
@@ -53,6 +102,91 @@ class Command(BaseCommand):
             active=True,
         )
         listing = Listing.objects.get(title="Smartphone")
-        Bid.objects.create(price=350, user=bob, listing=listing)
+        if not listing.num_bids():
+            place_bid(listing.id, bob, Decimal("350"))
         Comment.objects.create(user=charlie, listing=listing, text="Is it unlocked?")
         self.stdout.write(self.style.SUCCESS("✅ Listings and categories created"))
+
+    def seed_generated(self, rng, num_users, num_listings, bids_per_listing, batch):
+        """Bulk-create generated users, listings and bids in batches.
+
+        The denormalized price columns are computed in Python while the rows are
+        built, and the counters, search index and activity summaries are rebuilt
+        once at the end, so every row costs a share of one `INSERT` and nothing
+        else.
+        """
+        started = time.perf_counter()
+        prefix = f"seed{rng.randrange(10**6):06d}-"
+        password = make_password("testpass")
+        User.objects.bulk_create(
+            (
+                User(username=f"{prefix}{i}", email="", password=password)
+                for i in range(num_users)
+            ),
+            batch_size=batch,
+            ignore_conflicts=True,
+        )
+        # Only this run's users (the demo users if it made none), in creation order,
+        # so a given --seed places the same bids whatever else the database holds
+        if num_users:
+            usernames = {f"{prefix}{i}" for i in range(num_users)}
+            users = User.objects.filter(username__startswith=prefix)
+        else:
+            usernames = set(DEMO_USERS)
+            users = User.objects.filter(username__in=usernames)
+        user_ids = [
+            user_id
+            for user_id, username in users.order_by("id").values_list("id", "username")
+            if username in usernames
+        ]
+        category_ids = [
+            Category.objects.get_or_create(name=name)[0].id for name in CATEGORIES
+        ]
+        self.stdout.write(self.style.SUCCESS(f"✅ {num_users} users created"))
+        bids = 0
+        for offset in range(0, num_listings, batch):
+            listings = []
+            for _ in range(min(batch, num_listings - offset)):
+                title = " ".join(rng.sample(WORDS, 3)).capitalize()
+                price = Decimal(rng.randrange(100, 50000)) / 100
+                seller = rng.choice(user_ids)
+                listing = Listing(
+                    user_id=seller,
+                    category_id=rng.choice(category_ids),
+                    title=title,
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                    starting_price=price,
+                    current_price=price,
+                )
+                # Bid prices climb from the starting price by random increments
+                listing.seeded_bids = []
+                for _ in range(bids_per_listing):
+                    bidder = rng.choice(user_ids)
+                    if bidder == seller and len(user_ids) > 1:
+                        bidder = rng.choice([i for i in user_ids[:2] if i != seller])
+                    listing.seeded_bids.append((bidder, listing.current_price))
+                    listing.current_price += Decimal(rng.randrange(1, 500)) / 100
+                    listing.high_bidder_id = bidder
+                if listing.seeded_bids:
+                    listing.current_price = listing.seeded_bids[-1][1]
+                listing.bid_count = len(listing.seeded_bids)
+                listings.append(listing)
+            Listing.objects.bulk_create(listings)
+            created = Bid.objects.bulk_create(
+                Bid(user_id=bidder, listing_id=listing.id, price=price)
+                for listing in listings
+                for bidder, price in listing.seeded_bids
+            )
+            bids += len(created)
+            self.stdout.write(f"  {offset + len(listings)}/{num_listings} listings")
+        call_command("rebuild_category_counts", stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        call_command("rebuild_user_activity", stdout=self.stdout)
+        elapsed = time.perf_counter() - started
+        rows = num_users + num_listings + bids
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {num_listings} listings and {bids} bids created in "
+                f"{elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"
+            )
+        )
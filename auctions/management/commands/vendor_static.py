@@ -0,0 +1,52 @@
+# auctions/management/commands/vendor_static.py
+
+import base64
+import hashlib
+import re
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.vendor import ASSETS, VENDOR_DIR
+
+# Source maps are not vendored, and the manifest storage fails on dangling links
+SOURCE_MAP = re.compile(rb"\n?(/\*# sourceMappingURL=\S+ \*/|//# sourceMappingURL=\S+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Downloads the pinned Bootstrap and jQuery static files to check in; a "
+        "development tool, not a build step"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Download files that are already present again",
+        )
+
+    def handle(self, *args, **options):
+        fetched = 0
+        for name, asset in ASSETS.items():
+            path = VENDOR_DIR / name
+            if path.exists() and not options["force"]:
+                continue
+            with urllib.request.urlopen(asset.url, timeout=30) as response:
+                content = response.read()
+            digest = (
+                "sha384-" + base64.b64encode(hashlib.sha384(content).digest()).decode()
+            )
+            if digest != asset.integrity:
+                raise CommandError(f"{asset.url} does not match its integrity hash")
+            if path.suffix in (".css", ".js"):
+                content = SOURCE_MAP.sub(b"", content)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            fetched += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {fetched} vendored file(s) downloaded to {VENDOR_DIR}; "
+                "commit them"
+            )
+        )
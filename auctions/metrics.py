@@ -0,0 +1,132 @@
+"""Per-view request metrics collected by `middleware.QueryMetricsMiddleware`.
+
+Queries are timed by an execute wrapper installed on every database connection.
+It only records while a `QueryRecorder` is active in the current context, and
+context variables follow a request into `sync_to_async` threads, so this works
+for both the WSGI and the ASGI application.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+recorder: ContextVar["QueryRecorder | None"] = ContextVar("recorder", default=None)
+
+
+@dataclass
+class QueryRecorder:
+    """The queries run while handling one request."""
+
+    db_time: float = 0.0
+    queries: Counter = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self) -> int:
+        """Count the queries that repeat an earlier one with the same parameters."""
+        return sum(count - 1 for count in self.queries.values())
+
+
+def record_query(execute, sql, params, many, context):
+    current = recorder.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.db_time += time.perf_counter() - started
+        current.queries[(sql, repr(params))] += 1
+
+
+def install(connection) -> None:
+    """Time the queries of `connection` whenever a recorder is active."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@dataclass
+class ViewMetrics:
+    """Running totals for the sampled requests of one view."""
+
+    requests: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    db_seconds: float = 0.0
+    queries: int = 0
+    duplicate_queries: int = 0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.seconds / self.requests * 1000
+
+    @property
+    def max_ms(self) -> float:
+        return self.max_seconds * 1000
+
+    @property
+    def mean_db_ms(self) -> float:
+        return self.db_seconds / self.requests * 1000
+
+    @property
+    def mean_queries(self) -> float:
+        return self.queries / self.requests
+
+
+class Registry:
+    """Thread-safe per-view totals for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: dict[str, ViewMetrics] = {}
+
+    def record(self, view: str, seconds: float, queries: QueryRecorder) -> None:
+        with self._lock:
+            metrics = self._views.setdefault(view, ViewMetrics())
+            metrics.requests += 1
+            metrics.seconds += seconds
+            metrics.max_seconds = max(metrics.max_seconds, seconds)
+            metrics.db_seconds += queries.db_time
+            metrics.queries += queries.count
+            metrics.duplicate_queries += queries.duplicates
+
+    def snapshot(self) -> dict[str, ViewMetrics]:
+        with self._lock:
+            return {
+                view: ViewMetrics(**vars(metrics))
+                for view, metrics in sorted(self._views.items())
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def prometheus(self) -> str:
+        """Render the totals in the Prometheus text exposition format."""
+        series = [
+            ("requests", "counter", "Sampled requests"),
+            ("seconds", "counter", "Wall time of sampled requests"),
+            ("max_seconds", "gauge", "Slowest sampled request"),
+            ("db_seconds", "counter", "Database time of sampled requests"),
+            ("queries", "counter", "Queries of sampled requests"),
+            ("duplicate_queries", "counter", "Repeated queries of sampled requests"),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for name, kind, help_text in series:
+            metric = f"auctions_view_{name}"
+            if kind == "counter":
+                metric += "_total"
+            lines.append(f"# HELP {metric} {help_text}.")
+            lines.append(f"# TYPE {metric} {kind}")
+            for view, metrics in snapshot.items():
+                lines.append(f'{metric}{{view="{view}"}} {getattr(metrics, name)}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,74 @@
+"""Middleware for the auctions app."""
+
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+
+from .metrics import QueryRecorder, recorder, registry
+
+
+class QueryMetricsMiddleware:
+    """Record the wall time, DB time and query counts of a sample of requests.
+
+    A fraction `AUCTIONS_METRICS_SAMPLE_RATE` of requests is measured; a rate of
+    0 removes the middleware entirely. Sampled responses carry the figures in a
+    `Server-Timing` header and the totals are shown by the `metrics` views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.AUCTIONS_METRICS_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        queries = QueryRecorder()
+        token = recorder.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            recorder.reset(token)
+        return self.finish(request, response, started, queries)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        queries = QueryRecorder()
+        token = recorder.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            recorder.reset(token)
+        return self.finish(request, response, started, queries)
+
+    def finish(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        started: float,
+        queries: QueryRecorder,
+    ) -> HttpResponse:
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        registry.record(match.view_name if match else "unresolved", elapsed, queries)
+        response["Server-Timing"] = (
+            f"total;dur={elapsed * 1000:.1f}, "
+            f"db;dur={queries.db_time * 1000:.1f};"
+            f'desc="{queries.count} queries, {queries.duplicates} duplicates"'
+        )
+        return response
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:39
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_stats(apps, schema_editor):
+    """Populate the denormalized bid columns from the existing `Bid` rows."""
+    Bid = apps.get_model("auctions", "Bid")
+    Listing = apps.get_model("auctions", "Listing")
+    bids = Bid.objects.filter(listing=OuterRef("pk"))
+    top = bids.order_by("-price", "placed")
+    Listing.objects.update(
+        bid_count=Coalesce(
+            Subquery(
+                bids.values("listing").annotate(total=Count("pk")).values("total")
+            ),
+            0,
+        ),
+        current_price=Coalesce(Subquery(top.values("price")[:1]), F("starting_price")),
+        high_bidder=Subquery(top.values("user")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0007_alter_bid_placed_alter_category_created_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="bid_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="current_price",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.01"), max_digits=7
+            ),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="high_bidder",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="leading_listings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(backfill_bid_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0008_listing_bid_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["active", "created", "id"], name="listing_feed_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_active_counts(apps, schema_editor):
+    """Count the active listings of every existing category."""
+    Category = apps.get_model("auctions", "Category")
+    Listing = apps.get_model("auctions", "Listing")
+    counts = (
+        Listing.objects.filter(active=True, category=OuterRef("pk"))
+        .values("category")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Category.objects.update(active_listing_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0009_listing_feed_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="active_listing_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_active_counts, migrations.RunPython.noop),
+    ]
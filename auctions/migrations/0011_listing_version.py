@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0010_category_active_listing_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:50
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    # A self-contained FTS5 table rather than an external-content one with
+    # triggers, because SQLite drops triggers whenever a migration remakes the
+    # listing table; the listing signals keep it in sync instead.
+    "CREATE VIRTUAL TABLE auctions_listing_fts USING fts5("
+    "title, description, tokenize = 'porter unicode61')",
+    "INSERT INTO auctions_listing_fts (rowid, title, description) "
+    "SELECT id, title, description FROM auctions_listing",
+]
+SQLITE_BACKWARD = ["DROP TABLE auctions_listing_fts"]
+
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE auctions_listing ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX auctions_listing_search_idx ON auctions_listing "
+    "USING GIN (search_vector)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX auctions_listing_search_idx",
+    "ALTER TABLE auctions_listing DROP COLUMN search_vector",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0011_listing_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}),
+            run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRESQL_BACKWARD}),
+        ),
+    ]
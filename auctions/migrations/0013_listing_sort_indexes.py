@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0012_listing_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["active", "current_price", "id"], name="listing_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["active", "bid_count", "id"], name="listing_bids_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["category", "active", "created", "id"],
+                name="listing_category_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Now
+
+
+def backfill_closed_listings(apps, schema_editor):
+    """Record winners for listings that were closed before winners were stored."""
+    Listing = apps.get_model("auctions", "Listing")
+    Listing.objects.filter(active=False).update(
+        closed_at=Now(), winner=F("high_bidder")
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0013_listing_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="closed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="ends_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="winner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="won_listings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["active", "ends_at", "id"], name="listing_ending_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_closed_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0014_listing_ends_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["updated"], name="listing_updated_idx"),
+        ),
+    ]
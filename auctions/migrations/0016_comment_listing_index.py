@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0015_listing_updated"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["listing", "created", "id"], name="comment_listing_idx"
+            ),
+        ),
+    ]
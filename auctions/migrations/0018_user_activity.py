@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0017_max_bid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserActivity",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="activity",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("bid_count", models.PositiveIntegerField(default=0)),
+                ("winning", models.JSONField(default=list)),
+                ("outbid", models.JSONField(default=list)),
+                ("won", models.JSONField(default=list)),
+                ("lost", models.JSONField(default=list)),
+                ("listings", models.JSONField(default=list)),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0018_user_activity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BidArchive",
+            fields=[
+                (
+                    "listing",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="bid_archive",
+                        serialize=False,
+                        to="auctions.listing",
+                    ),
+                ),
+                ("bid_count", models.PositiveIntegerField()),
+                ("data", models.BinaryField()),
+                ("archived", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # Before dropping the plain listing index, so bids stay indexed by listing
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(
+                fields=["listing", "-price", "placed"], name="bid_listing_price_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="bid",
+            name="listing",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="bids",
+                to="auctions.listing",
+            ),
+        ),
+    ]
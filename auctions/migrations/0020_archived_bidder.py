@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:46
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_bidders(apps, schema_editor):
+    """Record the bidders of archives written before this table existed."""
+    BidArchive = apps.get_model("auctions", "BidArchive")
+    ArchivedBidder = apps.get_model("auctions", "ArchivedBidder")
+    User = apps.get_model("auctions", "User")
+    for archive in BidArchive.objects.iterator(chunk_size=500):
+        bidders = {}
+        for bid_id, user_id, _, _ in json.loads(zlib.decompress(archive.data)):
+            count, last = bidders.get(user_id, (0, 0))
+            bidders[user_id] = (count + 1, max(last, bid_id))
+        # Users deleted since are left out
+        users = set(User.objects.filter(pk__in=bidders).values_list("pk", flat=True))
+        ArchivedBidder.objects.bulk_create(
+            ArchivedBidder(
+                archive_id=archive.pk, user_id=user_id, bid_count=count, last_bid=last
+            )
+            for user_id, (count, last) in bidders.items()
+            if user_id in users
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0019_bid_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedBidder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bid_count", models.PositiveIntegerField()),
+                ("last_bid", models.PositiveBigIntegerField()),
+                (
+                    "archive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bidders",
+                        to="auctions.bidarchive",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_bids",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("archive", "user"), name="archived_bidder_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_bidders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:01
+
+from django.db import migrations
+
+from auctions import activity
+
+
+def backfill_activity(apps, schema_editor):
+    """Summarize the bids, wins and listings of users from before 0018."""
+    activity.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auctions", "0020_archived_bidder"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
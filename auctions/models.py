@@ -1,9 +1,21 @@
 """Classes for the various models in the database for the auctions app."""
 
+import json
+import zlib
+from datetime import datetime
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Q, Value
+from django.utils import timezone
+
+
+def watchlist_cache_key(user_id: int) -> str:
+    """Return the cache key of a user's watched listing ids."""
+    return f"watchlist:{user_id}"
 
 
 class User(AbstractUser):
@@ -11,6 +23,35 @@ class User(AbstractUser):
 
     watchlist = models.ManyToManyField("Listing", blank=True, related_name="watchers")
 
+    def watched_listing_ids(self) -> frozenset[int]:
+        """Return the ids of the watched listings, cached between requests.
+
+        The cache entry is dropped whenever the watchlist changes (see
+        `signals.py`); `AUCTIONS_WATCHLIST_CACHE_TIMEOUT = 0`, the default with a
+        per-process cache, disables caching.
+        """
+        timeout = settings.AUCTIONS_WATCHLIST_CACHE_TIMEOUT
+        ids = cache.get(watchlist_cache_key(self.pk)) if timeout else None
+        if ids is None:
+            ids = frozenset(
+                User.watchlist.through.objects.filter(user=self.pk).values_list(
+                    "listing", flat=True
+                )
+            )
+            if timeout:
+                cache.set(watchlist_cache_key(self.pk), ids, timeout)
+        return ids
+
+
+class CategoryQuerySet(models.QuerySet):
+    """Queryset for categories."""
+
+    def with_active_counts(self) -> "CategoryQuerySet":
+        """Annotate `num_active` by counting active listings in one grouped query."""
+        return self.annotate(
+            num_active=Count("listings", filter=Q(listings__active=True))
+        )
+
 
 class Category(models.Model):
     """Model for a category which includes the name, picture, and created fields."""
@@ -18,13 +59,52 @@ class Category(models.Model):
     name = models.CharField(max_length=64)
     image_url = models.URLField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    # Counter cache kept current by the listing signals in `signals.py`; rebuild it
+    # with the `rebuild_category_counts` management command if it drifts.
+    active_listing_count = models.PositiveIntegerField(default=0)
+
+    objects = CategoryQuerySet.as_manager()
 
     def __str__(self) -> str:
         return str(self.name)
 
     def active_count(self) -> int:
         """Get the active count of the listings."""
-        return self.listings.filter(active=True).count()
+        return self.active_listing_count
+
+
+class ListingQuerySet(models.QuerySet):
+    """Queryset for listings with helpers for the listing feeds."""
+
+    def active(self, active: bool = True) -> "ListingQuerySet":
+        """Filter on the active flag in a form the feed indexes can serve.
+
+        `filter(active=True)` compiles to a bare `WHERE active`, which SQLite
+        cannot match against an index; an `IN` list compiles to an equality.
+        """
+        return self.filter(active__in=[active])
+
+    def touch(self) -> int:
+        """Mark the listings as changed without going through `save()`."""
+        return self.update(updated=timezone.now())
+
+    def with_pricing(self, user: User | None = None) -> "ListingQuerySet":
+        """Fetch the pricing and watch state of each listing in a single query.
+
+        The current price and bid count are stored on the listing itself, so only
+        the high bidder is joined and `is_watched` is annotated for `user`.
+        """
+        listings = self.select_related("high_bidder")
+        if user is None or not user.is_authenticated:
+            return listings.annotate(is_watched=Value(False))
+        watched = User.watchlist.through.objects.filter(
+            user=user.pk, listing=OuterRef("pk")
+        )
+        return listings.annotate(is_watched=Exists(watched))
+
+
+# Columns of `Listing` only bids write, with compare-and-swap updates in `bidding.py`
+BID_FIELDS = ("current_price", "high_bidder", "bid_count")
 
 
 class Listing(models.Model):
@@ -46,36 +126,230 @@ class Listing(models.Model):
     image_url = models.URLField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
     active = models.BooleanField(default=True)
+    # Optional scheduled end; the listing is closed once `ends_at` has passed (see the
+    # `close_expired_listings` command)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    closed_at = models.DateTimeField(blank=True, null=True)
+    winner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="won_listings",
+    )
+    # Denormalized from `Bid` and kept current by `bidding.place_bid()`; rebuild
+    # them with the `recompute_listing_stats` management command if they drift.
+    # `save()` never writes them back on updates (see `BID_FIELDS`).
+    current_price = models.DecimalField(
+        max_digits=7, decimal_places=2, default=Decimal("0.01")
+    )
+    high_bidder = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="leading_listings",
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    # Bumped by every bid, edit and close so cached listing cards are never stale
+    version = models.PositiveIntegerField(default=0)
+    # Last change to anything the listing pages show: edits, bids, comments, closing
+    # and watchlist changes; the HTTP validators of `conditional.py` are built on it
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated feeds ordered by (created, id)
+            models.Index(fields=["active", "created", "id"], name="listing_feed_idx"),
+            # Serve the other sort orders and the category feed of `ListingFilterForm`
+            models.Index(
+                fields=["active", "current_price", "id"], name="listing_price_idx"
+            ),
+            models.Index(fields=["active", "bid_count", "id"], name="listing_bids_idx"),
+            models.Index(
+                fields=["category", "active", "created", "id"],
+                name="listing_category_feed_idx",
+            ),
+            # Serves the expiry sweep and the "ending soon" sort
+            models.Index(fields=["active", "ends_at", "id"], name="listing_ending_idx"),
+            # Serves the latest change across all listings for the feed validators
+            models.Index(fields=["updated"], name="listing_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return str(self.title)
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Until the first bid arrives the current price is the starting price
+            if not self.bid_count:
+                self.current_price = self.starting_price
+            super().save(*args, **kwargs)
+            return
+        # An instance read before later bids must not write their columns back, so
+        # updates leave them out unless asked for by name
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in BID_FIELDS
+            ]
+            kwargs["update_fields"] = update_fields
+        # Bumped in SQL, so a bid committed since this instance was read keeps its
+        # own bump
+        self.version = F("version") + 1
+        super().save(*args, **kwargs)
+        if "starting_price" in update_fields:
+            Listing.objects.filter(pk=self.pk, bid_count=0).update(
+                current_price=F("starting_price")
+            )
+        self.refresh_from_db(fields=["version", *BID_FIELDS])
+
     def highest_bid(self) -> "Bid | None":
         """Return the `Bid` with the highest price."""
-        return self.bids.order_by("-price").first()
+        return self.bids.order_by("-price", "placed").first()
 
     def num_bids(self) -> int:
         """Return the number of bids for the `Listing`."""
-        return len(self.bids.all())
+        return self.bid_count
 
     def price(self) -> Decimal:
         """The current price, which is either the starting price or the highest bid."""
-        bid = self.highest_bid()
-        return bid.price if bid else self.starting_price
+        return self.current_price
 
 
 class Bid(models.Model):
     """Model for a listing which includes the user, listing, price, and placed fields."""
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="bids")
+    # Indexed by `bid_listing_price_idx`, which starts with the listing
+    listing = models.ForeignKey(
+        Listing, on_delete=models.CASCADE, related_name="bids", db_index=False
+    )
     price = models.DecimalField(max_digits=7, decimal_places=2)
     placed = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves `Listing.highest_bid()` and the price recompute without a sort
+            models.Index(
+                fields=["listing", "-price", "placed"], name="bid_listing_price_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.price} on {self.listing}"
 
 
+class BidArchive(models.Model):
+    """Model for the archived bids of a long-closed listing, one row per listing.
+
+    `archive.py` moves every bid but the winning one out of `Bid` into `data`, a
+    zlib-compressed JSON list of `[id, user id, price, placed]` rows, oldest first.
+    """
+
+    listing = models.OneToOneField(
+        Listing, on_delete=models.CASCADE, primary_key=True, related_name="bid_archive"
+    )
+    bid_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.bid_count} archived bid(s) on {self.listing_id}"
+
+    def bids(self) -> list["Bid"]:
+        """Return the archived bids as unsaved `Bid` instances."""
+        return [
+            Bid(
+                id=bid_id,
+                user_id=user_id,
+                listing_id=self.listing_id,
+                price=Decimal(price),
+                placed=datetime.fromisoformat(placed),
+            )
+            for bid_id, user_id, price, placed in json.loads(zlib.decompress(self.data))
+        ]
+
+
+class ArchivedBidder(models.Model):
+    """Model for one user's bids in a `BidArchive`, indexed by user.
+
+    Lets `activity.rebuild()` count archived bids per user without decoding
+    archives.
+    """
+
+    archive = models.ForeignKey(
+        BidArchive, on_delete=models.CASCADE, related_name="bidders"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="archived_bids"
+    )
+    bid_count = models.PositiveIntegerField()
+    # The id of the user's last archived bid on the listing
+    last_bid = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["archive", "user"], name="archived_bidder_unique"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.bid_count} archived bid(s) by {self.user_id}"
+
+
+class MaxBid(models.Model):
+    """Model for the most a user will pay for a listing, bid up to by `proxy.py`."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="max_bids")
+    listing = models.ForeignKey(
+        Listing, on_delete=models.CASCADE, related_name="max_bids"
+    )
+    amount = models.DecimalField(max_digits=7, decimal_places=2)
+    # When the amount was last set; of two equal maximums the earlier one wins
+    placed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["listing", "user"], name="max_bid_listing_user_unique"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"Up to {self.amount} on {self.listing}"
+
+
+class UserActivity(models.Model):
+    """Model for the summary behind a user's activity page, one row per user.
+
+    Each list holds listing ids, most recently changed last. Bid placement and
+    closing keep the lists current through `activity.py`; rebuild them with the
+    `rebuild_user_activity` management command if they drift.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="activity"
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    # Active listings the user leads, and those where another bidder leads
+    winning = models.JSONField(default=list)
+    outbid = models.JSONField(default=list)
+    # Closed listings the user bid on, by whether they won them
+    won = models.JSONField(default=list)
+    lost = models.JSONField(default=list)
+    # The user's own listings
+    listings = models.JSONField(default=list)
+
+    def __str__(self) -> str:
+        return f"Activity of {self.user_id}"
+
+
 class Comment(models.Model):
     """Model for a comment which includes the user, listing, text, and created fields."""
 
@@ -86,5 +360,13 @@ class Comment(models.Model):
     text = models.CharField(max_length=256)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated comments of a listing, oldest first
+            models.Index(
+                fields=["listing", "created", "id"], name="comment_listing_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.text} on {self.listing}"
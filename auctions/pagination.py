@@ -0,0 +1,137 @@
+"""Keyset (cursor) pagination for the listing feeds and lists of listing ids."""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest, QueryDict
+
+DEFAULT_ORDERING = ("-created", "-id")
+# Comments read top to bottom in the order they were written
+COMMENT_ORDERING = ("created", "id")
+
+
+@dataclass
+class KeysetPage:
+    """One page of a feed plus the query strings of the first and next pages."""
+
+    items: list
+    next_query: str | None
+    first_query: str | None
+
+
+def page_size(request: HttpRequest) -> int:
+    """Return the page size requested with `?size=`, clamped to the configured max."""
+    try:
+        size = int(request.GET.get("size", settings.AUCTIONS_PAGE_SIZE))
+    except ValueError:
+        size = settings.AUCTIONS_PAGE_SIZE
+    return max(1, min(size, settings.AUCTIONS_MAX_PAGE_SIZE))
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the ordering values of the last row on a page as an opaque cursor."""
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, queryset: QuerySet, ordering: tuple) -> list | None:
+    """Decode `cursor` back into typed ordering values, or `None` if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    opts = queryset.model._meta
+    try:
+        return [
+            opts.get_field(name.lstrip("-")).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except ValidationError:
+        return None
+
+
+def after(ordering: tuple, values: list) -> Q:
+    """Build the filter for rows that sort strictly after `values` in `ordering`.
+
+    For an ordering of (a, b) this is `a > x OR (a = x AND b > y)`, with the
+    comparison flipped for descending fields, which an index on (a, b) can seek.
+    """
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        field = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{field}__{lookup}": value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def ordering_values(row, queryset: QuerySet, ordering: tuple) -> list:
+    """Return the ordering values of a model instance or a `.values()` row."""
+    names = [name.lstrip("-") for name in ordering]
+    if isinstance(row, dict):
+        return [row[name] for name in names]
+    opts = queryset.model._meta
+    return [getattr(row, opts.get_field(name).attname) for name in names]
+
+
+def paginate(
+    request: HttpRequest, queryset: QuerySet, ordering: tuple = DEFAULT_ORDERING
+) -> KeysetPage:
+    """Return the page of `queryset` selected by the `?cursor=` of the request.
+
+    Every page is a single indexed range scan of `size + 1` rows, so deep pages
+    cost the same as the first one. The ordering must end in a unique field and,
+    for `.values()` querysets, its fields must be among the selected ones.
+    """
+    size = page_size(request)
+    queryset = queryset.order_by(*ordering)
+    cursor = request.GET.get("cursor")
+    values = decode_cursor(cursor, queryset, ordering) if cursor else None
+    if values is not None:
+        queryset = queryset.filter(after(ordering, values))
+    items = list(queryset[: size + 1])
+    query: QueryDict = request.GET.copy()
+    query.pop("cursor", None)
+    first_query = None if values is None else query.urlencode()
+    next_query = None
+    if len(items) > size:
+        items = items[:size]
+        query["cursor"] = encode_cursor(ordering_values(items[-1], queryset, ordering))
+        next_query = query.urlencode()
+    return KeysetPage(items=items, next_query=next_query, first_query=first_query)
+
+
+def paginate_ids(request: HttpRequest, queryset: QuerySet, ids: list) -> KeysetPage:
+    """Return the rows of `queryset` on the page of `ids` after the `?cursor=` id.
+
+    For id lists that are already in memory, such as the activity summaries; the
+    page keeps the order of `ids` and skips ids that no longer exist. A cursor
+    whose id has since left the list starts again from the first page.
+    """
+    size = page_size(request)
+    start = 0
+    cursor = request.GET.get("cursor")
+    ordering = (queryset.model._meta.pk.name,)
+    values = decode_cursor(cursor, queryset, ordering) if cursor else None
+    if values is not None and values[0] in ids:
+        start = ids.index(values[0]) + 1
+    page_ids = ids[start : start + size]
+    rows = queryset.in_bulk(page_ids)
+    items = [rows[pk] for pk in page_ids if pk in rows]
+    query: QueryDict = request.GET.copy()
+    query.pop("cursor", None)
+    first_query = query.urlencode() if start else None
+    next_query = None
+    if start + size < len(ids):
+        query["cursor"] = encode_cursor([page_ids[-1]])
+        next_query = query.urlencode()
+    return KeysetPage(items=items, next_query=next_query, first_query=first_query)
@@ -0,0 +1,68 @@
+"""Proxy bidding: users register a maximum bid and the site bids for them.
+
+Instead of replaying the bidding war one increment at a time, `resolve()` works
+out its outcome in a single pass whenever a bid or a maximum arrives, like a
+second-price auction: the highest maximum wins (the earliest one on a tie) at one
+increment above the runner-up's maximum, capped at its own maximum. Only the
+resulting rows are written, at most two per arrival: the runner-up's bid at its
+maximum, and the winner's bid at the final price.
+
+`resolve()` is a pure function of the listing state; `bidding.py` loads the
+maximums, applies the rows and keeps the `Listing` columns in step.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+
+@dataclass(frozen=True)
+class Proxy:
+    """A user's maximum bid on a listing."""
+
+    user_id: int
+    amount: Decimal
+
+
+def resolve(
+    price: Decimal,
+    bid_count: int,
+    leader_id: int | None,
+    proxies: list[Proxy],
+    increment: Decimal,
+) -> list[tuple[int, Decimal]]:
+    """Return the `(user id, price)` bids the proxies place, in order.
+
+    `price`, `bid_count` and `leader_id` describe the listing as it stands, and
+    `proxies` are listed earliest first. The leader's standing bid counts as a
+    maximum of at least `price` that wins every tie, even against a maximum
+    registered before it, as when a manual bid matches one: a maximum can only
+    answer with a higher bid, and bids of equal price rank by when they were
+    placed (see `Listing.highest_bid()`), never by when a maximum was registered.
+    """
+    minimum = price + increment if bid_count else price
+    # user id: (maximum, rank); lower ranks win ties
+    candidates = {}
+    if leader_id is not None:
+        candidates[leader_id] = (price, -1)
+    for rank, proxy in enumerate(proxies):
+        if proxy.user_id == leader_id:
+            candidates[leader_id] = (max(price, proxy.amount), -1)
+        elif proxy.amount >= minimum:
+            candidates[proxy.user_id] = (proxy.amount, rank)
+    if all(user_id == leader_id for user_id in candidates):
+        return []
+    ranked = sorted(candidates.items(), key=lambda item: (-item[1][0], item[1][1]))
+    winner, (top, _) = ranked[0]
+    if len(ranked) == 1:
+        # The first bid on the listing, unopposed
+        return [(winner, minimum)]
+    runner_up, (second, _) = ranked[1]
+    final = min(top, second + increment)
+    bids = []
+    # The runner-up is outbid at its maximum, unless that is no higher than it
+    # already stands or the winner only matches it on a tie
+    if second < final and (runner_up != leader_id or second > price):
+        bids.append((runner_up, second))
+    if winner != leader_id or final > price:
+        bids.append((winner, final))
+    return bids
@@ -0,0 +1,96 @@
+"""Full-text search over listing titles and descriptions.
+
+On SQLite the text is indexed in the `auctions_listing_fts` FTS5 table, which the
+listing signals keep in sync on save and delete. On PostgreSQL the migration adds
+a generated `search_vector` tsvector column with a GIN index, so the database
+keeps it current by itself. Other databases fall back to a `LIKE` scan.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Listing
+
+FTS_TABLE = "auctions_listing_fts"
+# Matches in the title outrank matches in the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def terms(query: str) -> list[str]:
+    """Split a user query into plain word terms, dropping any search syntax."""
+    return re.findall(r"\w+", query.lower())
+
+
+def index_listing(listing: Listing) -> None:
+    """Add or refresh `listing` in the SQLite search index."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)",
+            [listing.pk, listing.title, listing.description],
+        )
+
+
+def unindex_listing(listing_id: int) -> None:
+    """Remove a listing from the SQLite search index."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing_id])
+
+
+def rebuild_index() -> int:
+    """Rebuild the search index from the listing table and return its size."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+                "SELECT id, title, description FROM auctions_listing"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        elif connection.vendor == "postgresql":
+            cursor.execute("REINDEX INDEX auctions_listing_search_idx")
+    return Listing.objects.count()
+
+
+def search(query: str, limit: int) -> list[int]:
+    """Return the ids of up to `limit` active listings matching `query`, best first.
+
+    Every term must match, and the last term also matches as a prefix so results
+    show up while the user is still typing.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            match = " ".join(f'"{word}"' for word in words) + "*"
+            cursor.execute(
+                f"SELECT l.id FROM {FTS_TABLE} f "
+                "JOIN auctions_listing l ON l.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND l.active "
+                f"ORDER BY bm25({FTS_TABLE}, %s, %s), l.id DESC LIMIT %s",
+                [match, TITLE_WEIGHT, DESCRIPTION_WEIGHT, limit],
+            )
+        elif connection.vendor == "postgresql":
+            tsquery = " & ".join(words) + ":*"
+            cursor.execute(
+                "SELECT id FROM auctions_listing, to_tsquery('english', %s) query "
+                "WHERE active AND search_vector @@ query "
+                "ORDER BY ts_rank(search_vector, query) DESC, id DESC LIMIT %s",
+                [tsquery, limit],
+            )
+        else:
+            listings = Listing.objects.filter(active=True)
+            for word in words:
+                listings = listings.filter(
+                    Q(title__icontains=word) | Q(description__icontains=word)
+                )
+            return list(listings.order_by("-id").values_list("id", flat=True)[:limit])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,121 @@
+"""Signal handlers that keep denormalized listing data current.
+
+They maintain the `Category.active_listing_count` counter cache, the SQLite
+full-text search index, the cached watchlist ids of each user, the sellers'
+activity summaries and the `Listing.updated` timestamp, and hook the query
+timing of `metrics.py` into new database connections.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import activity, metrics, search
+from .models import Category, Comment, Listing, User, watchlist_cache_key
+
+# Marks a listing whose category or active flag was deferred when it was loaded
+UNKNOWN = object()
+
+
+def counted_category(listing: Listing):
+    """Return the id of the category `listing` counts towards, if any."""
+    fields = listing.__dict__
+    if "active" not in fields or "category_id" not in fields:
+        return UNKNOWN
+    return fields["category_id"] if fields["active"] else None
+
+
+def adjust(category_id, delta: int) -> None:
+    if category_id is not None and category_id is not UNKNOWN:
+        Category.objects.filter(pk=category_id).update(
+            active_listing_count=Greatest(F("active_listing_count") + delta, 0)
+        )
+
+
+@receiver(post_init, sender=Listing)
+def remember_counted_category(sender, instance: Listing, **kwargs) -> None:
+    # Read the fields straight from __dict__ so deferred fields stay deferred
+    instance._counted_category = counted_category(instance)
+
+
+@receiver(post_save, sender=Listing)
+def update_category_counts(sender, instance: Listing, created: bool, **kwargs) -> None:
+    """Move the listing between counters when it is created, closed or recategorized."""
+    old = None if created else instance._counted_category
+    new = counted_category(instance)
+    if old is UNKNOWN or new is UNKNOWN or old == new:
+        return
+    adjust(old, -1)
+    adjust(new, 1)
+    instance._counted_category = new
+
+
+@receiver(post_delete, sender=Listing)
+def release_category_count(sender, instance: Listing, **kwargs) -> None:
+    adjust(instance._counted_category, -1)
+
+
+@receiver(post_save, sender=Listing)
+def record_new_listing(sender, instance: Listing, created: bool, **kwargs) -> None:
+    if created:
+        activity.record_listing(instance)
+
+
+@receiver(post_save, sender=Listing)
+def update_search_index(
+    sender, instance: Listing, update_fields=None, **kwargs
+) -> None:
+    if update_fields is None or {"title", "description"} & set(update_fields):
+        search.index_listing(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def remove_from_search_index(sender, instance: Listing, **kwargs) -> None:
+    search.unindex_listing(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.watchlist.through)
+def forget_watched_ids(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # `post_clear` has no `pk_set`, so note who watched the listing beforehand
+        instance._cleared_watcher_ids = list(
+            sender.objects.filter(listing=instance.pk).values_list("user", flat=True)
+        )
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        cache.delete(watchlist_cache_key(instance.pk))
+        return
+    if action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_watcher_ids", ())
+    if pk_set:
+        cache.delete_many([watchlist_cache_key(pk) for pk in pk_set])
+
+
+@receiver(m2m_changed, sender=User.watchlist.through)
+def touch_watched_listings(
+    sender, instance, action: str, reverse: bool, pk_set, **kwargs
+):
+    """Change the validators of listings whose watch button changes."""
+    if reverse and action.startswith("post_"):
+        Listing.objects.filter(pk=instance.pk).touch()
+    elif action in ("post_add", "post_remove") and pk_set:
+        Listing.objects.filter(pk__in=pk_set).touch()
+    elif action == "pre_clear" and not reverse:
+        instance.watchlist.all().touch()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_listing(sender, instance: Comment, **kwargs) -> None:
+    Listing.objects.filter(pk=instance.listing_id).touch()
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs) -> None:
+    if settings.AUCTIONS_METRICS_SAMPLE_RATE > 0:
+        metrics.install(connection)
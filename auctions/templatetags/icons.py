@@ -0,0 +1,32 @@
+"""Template tags that draw icons from the SVG sprite in our static files."""
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+SPRITE = "auctions/icons.svg"
+
+
+@register.simple_tag
+def icon(name: str, title: str = "", css_class: str = "") -> str:
+    """Render the `<svg>` of icon `name`, labelled by `title` or hidden from readers.
+
+    Usage: `{% icon "bookmark-check" title="On your watchlist" css_class="text-info" %}`
+    """
+    href = f"{static(SPRITE)}#{name}"
+    if title:
+        return format_html(
+            '<svg class="bi {}" role="img" aria-label="{}"><title>{}</title>'
+            '<use href="{}"></use></svg>',
+            css_class,
+            title,
+            title,
+            href,
+        )
+    return format_html(
+        '<svg class="bi {}" aria-hidden="true"><use href="{}"></use></svg>',
+        css_class,
+        href,
+    )
@@ -0,0 +1,26 @@
+"""Template tags that point images at the local thumbnail cache."""
+
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag("auctions/thumbnail.html")
+def thumbnail(url: str, alt: str = "", css_class: str = "thumbnail") -> dict:
+    """Render a `<picture>` of WebP and JPEG thumbnails for each screen density.
+
+    Usage: `{% thumbnail listing.image_url alt=listing.title %}`
+    """
+    context = {"alt": alt, "css_class": css_class, "size": thumbnails.WIDTHS[0]}
+    if not url:
+        return context
+    for fmt in thumbnails.FORMATS:
+        context[fmt] = ", ".join(
+            f"{thumbnails.thumbnail_url(url, width, fmt)} "
+            f"{width // thumbnails.WIDTHS[0]}x"
+            for width in thumbnails.WIDTHS
+        )
+    context["src"] = thumbnails.thumbnail_url(url, thumbnails.WIDTHS[0], "jpeg")
+    return context
@@ -0,0 +1,26 @@
+"""Template tags that load the pinned vendor assets of `vendor.py`."""
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from .. import vendor
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name: str) -> str:
+    """Render the `<link>` or `<script>` element of a pinned vendor asset.
+
+    Usage: `{% vendor_asset "bootstrap/bootstrap.min.css" %}`
+    """
+    asset = vendor.ASSETS[name]
+    if vendor.is_vendored(name):
+        src, attrs = static(vendor.STATIC_PREFIX + name), ""
+    else:
+        src = asset.url
+        attrs = format_html(' integrity="{}" crossorigin="anonymous"', asset.integrity)
+    if name.endswith(".css"):
+        return format_html('<link rel="stylesheet" href="{}"{}>', src, attrs)
+    return format_html('<script src="{}"{}></script>', src, attrs)
@@ -1,3 +1,1534 @@
-from django.test import TestCase
+"""Tests for the auctions app."""
 
-# Create your tests here.
+import asyncio
+import http.server
+import importlib
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import addModuleCleanup, mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings as django_settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.template import Context, Template
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import metrics, thumbnails, vendor
+from .archive import archive_closed_listings
+from .bidding import (
+    ACCEPTED,
+    BUSY,
+    CLOSED,
+    NOT_FOUND,
+    OUTBID,
+    OWN_LISTING,
+    TOO_LOW,
+    place_bid,
+    set_max_bid,
+)
+from .closing import close_expired_listings, close_listings
+from .events import InProcessBroker, get_broker
+from .models import (
+    ArchivedBidder,
+    Bid,
+    BidArchive,
+    Category,
+    Comment,
+    Listing,
+    MaxBid,
+    User,
+    UserActivity,
+    watchlist_cache_key,
+)
+from .proxy import Proxy, resolve
+from .search import search
+from .views import ListingFilterForm
+
+
+def setUpModule():
+    # Pages render through the manifest storage used in production, so every
+    # static file a template refers to must have been collected
+    static_root = tempfile.mkdtemp()
+    addModuleCleanup(shutil.rmtree, static_root)
+    static_settings = override_settings(STATIC_ROOT=static_root)
+    static_settings.enable()
+    addModuleCleanup(static_settings.disable)
+    call_command("collectstatic", interactive=False, verbosity=0)
+
+
+class ListingFeedQueryTests(TestCase):
+    """The listing feeds issue a fixed number of queries however many rows exist."""
+
+    # Session, user, the latest listing change for the validators and the feed
+    # itself, plus the category on the category page and the category choices of
+    # the filter form on the index page
+    FEED_QUERIES = {"index": 5, "category": 5, "watchlist": 4}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="testpass")
+        cls.bidder = User.objects.create_user("bidder", password="testpass")
+        cls.category = Category.objects.create(name="Electronics")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.bidder)
+
+    def create_listings(self, count: int) -> None:
+        for i in range(count):
+            listing = Listing.objects.create(
+                user=self.seller,
+                category=self.category,
+                title=f"Listing {i}",
+                starting_price=Decimal("10.00"),
+            )
+            place_bid(listing.id, self.bidder, Decimal("12.50"))
+            self.bidder.watchlist.add(listing)
+
+    def get_feed(self, name: str):
+        if name == "category":
+            return self.client.get(reverse(name, args=[self.category.id]))
+        return self.client.get(reverse(name))
+
+    def test_query_count_is_constant(self):
+        for count in (1, 20):
+            self.create_listings(count)
+            for name, queries in self.FEED_QUERIES.items():
+                with self.subTest(feed=name, listings=count):
+                    with self.assertNumQueries(queries):
+                        response = self.get_feed(name)
+                    self.assertContains(response, "$12.50")
+
+
+class ListingPageQueryTests(TestCase):
+    """The listing page loads comments a page at a time with their authors."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.listing = Listing.objects.create(user=cls.seller, title="Lamp")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.seller)
+
+    def add_comments(self, count: int) -> None:
+        for i in range(count):
+            Comment.objects.create(
+                user=User.objects.create_user(f"commenter{Comment.objects.count()}"),
+                listing=self.listing,
+                text=f"Comment {i}",
+            )
+
+    def test_query_count_is_constant(self):
+        url = reverse("listing", args=[self.listing.id])
+        for count in (1, 30):
+            self.add_comments(count)
+            # Session, user, validator timestamp, listing with high bidder, comments
+            # page and the watched ids, read once per request
+            with self.assertNumQueries(6):
+                response = self.client.get(url, {"size": 10})
+            self.assertLessEqual(len(response.context["comments"]), 10)
+
+    def test_comments_page_oldest_first(self):
+        self.add_comments(3)
+        url = reverse("listing", args=[self.listing.id])
+        response = self.client.get(url, {"size": 2})
+        self.assertEqual(
+            [comment.text for comment in response.context["comments"]],
+            ["Comment 0", "Comment 1"],
+        )
+        response = self.client.get(f"{url}?{response.context['page'].next_query}")
+        self.assertEqual(
+            [comment.text for comment in response.context["comments"]], ["Comment 2"]
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """The feeds page through every listing exactly once, newest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", password="testpass")
+        cls.listings = [
+            Listing.objects.create(user=cls.user, title=f"Listing {i}")
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_pages_cover_feed_in_order(self):
+        seen = []
+        query = "size=2"
+        while query:
+            response = self.client.get(f"{reverse('index')}?{query}")
+            page = response.context["page"]
+            self.assertLessEqual(len(page.items), 2)
+            seen.extend(listing.id for listing in page.items)
+            query = page.next_query
+        self.assertEqual(seen, [listing.id for listing in reversed(self.listings)])
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(reverse("index"), {"cursor": "not-a-cursor"})
+        self.assertEqual(len(response.context["page"].items), 5)
+
+
+class PlaceBidTests(TestCase):
+    """Bids are checked against the stored price and update it when accepted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="testpass")
+        cls.bidder = User.objects.create_user("bidder", password="testpass")
+        cls.listing = Listing.objects.create(
+            user=cls.seller, title="Lamp", starting_price=Decimal("5.00")
+        )
+
+    def test_first_bid_may_equal_starting_price(self):
+        result = place_bid(self.listing.id, self.bidder, Decimal("5.00"))
+        self.assertEqual(result.status, ACCEPTED)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.price(), Decimal("5.00"))
+        self.assertEqual(self.listing.high_bidder, self.bidder)
+        self.assertEqual(self.listing.num_bids(), 1)
+
+    def test_rejections(self):
+        place_bid(self.listing.id, self.bidder, Decimal("6.00"))
+        self.assertEqual(
+            place_bid(self.listing.id, self.bidder, Decimal("6.00")).status, TOO_LOW
+        )
+        self.assertEqual(
+            place_bid(self.listing.id, self.seller, Decimal("9.00")).status,
+            OWN_LISTING,
+        )
+        Listing.objects.filter(pk=self.listing.id).update(active=False)
+        self.assertEqual(
+            place_bid(self.listing.id, self.bidder, Decimal("9.00")).status, CLOSED
+        )
+        self.assertEqual(Bid.objects.count(), 1)
+
+
+class ListingSaveTests(TestCase):
+    """Saving a listing read before a bid leaves the bid's columns alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+
+    def test_stale_save_keeps_bids(self):
+        listing = Listing.objects.create(
+            user=self.seller, title="Lamp", starting_price=Decimal("5.00")
+        )
+        stale = Listing.objects.get(pk=listing.pk)
+        place_bid(listing.id, self.bidder, Decimal("6.00"))
+        stale.title = "Brass lamp"
+        stale.starting_price = Decimal("4.00")
+        stale.save()
+        listing.refresh_from_db()
+        self.assertEqual(listing.title, "Brass lamp")
+        self.assertEqual(
+            (listing.current_price, listing.bid_count, listing.high_bidder),
+            (Decimal("6.00"), 1, self.bidder),
+        )
+        self.assertEqual(listing.version, 2)
+        self.assertEqual(stale.current_price, Decimal("6.00"))
+
+    def test_starting_price_edit_moves_price_until_first_bid(self):
+        listing = Listing.objects.create(
+            user=self.seller, title="Desk", starting_price=Decimal("5.00")
+        )
+        listing.starting_price = Decimal("8.00")
+        listing.save()
+        self.assertEqual(listing.current_price, Decimal("8.00"))
+
+
+class ConcurrentBiddingTests(TransactionTestCase):
+    """Many threads bidding on one listing never accept a non-increasing bid."""
+
+    THREADS = 8
+    BIDS_PER_THREAD = 25
+    # Generous bound on the whole race: the contended bids take well under a
+    # second here, so only a lock convoy or retry storm comes near it
+    TIME_LIMIT = 60
+
+    def test_concurrent_bids_stay_consistent(self):
+        seller = User.objects.create_user("seller")
+        bidders = [User.objects.create_user(f"bidder{i}") for i in range(self.THREADS)]
+        listing = Listing.objects.create(
+            user=seller, title="Hot item", starting_price=Decimal("1.00")
+        )
+        results = []
+        start = threading.Barrier(self.THREADS)
+
+        def bid(user: User, offset: int) -> None:
+            start.wait()
+            try:
+                for i in range(self.BIDS_PER_THREAD):
+                    # Threads race with overlapping (and sometimes equal) prices
+                    price = Decimal(i * self.THREADS + offset % 4 + 1)
+                    results.append(place_bid(listing.id, user, price, retries=50))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=bid, args=(user, i))
+            for i, user in enumerate(bidders)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, self.TIME_LIMIT)
+        self.assertEqual(len(results), self.THREADS * self.BIDS_PER_THREAD)
+        self.assertNotIn(BUSY, {result.status for result in results})
+        accepted = [result for result in results if result.accepted]
+        bids = list(Bid.objects.filter(listing=listing).order_by("id"))
+        self.assertEqual(len(bids), len(accepted))
+        prices = [bid.price for bid in bids]
+        self.assertEqual(prices, sorted(set(prices)))
+        listing.refresh_from_db()
+        self.assertEqual(listing.bid_count, len(bids))
+        self.assertEqual(listing.current_price, bids[-1].price)
+        self.assertEqual(listing.high_bidder_id, bids[-1].user_id)
+
+
+def bid_war(price, bid_count, leader_id, proxies, increment):
+    """Play out the proxies one minimal bid at a time; return the leader and price."""
+    while True:
+        minimum = price + increment if bid_count else price
+        bidder = next(
+            (
+                proxy.user_id
+                for proxy in proxies
+                if proxy.user_id != leader_id and proxy.amount >= minimum
+            ),
+            None,
+        )
+        if bidder is None:
+            return leader_id, price
+        leader_id, price, bid_count = bidder, minimum, bid_count + 1
+
+
+class ProxyResolveTests(SimpleTestCase):
+    """Randomized properties of the single-pass maximum bid resolution."""
+
+    TRIALS = 2000
+
+    def random_state(self, rng: random.Random):
+        def cents(low: int, high: int) -> Decimal:
+            return Decimal(rng.randint(low, high)) / 100
+
+        increment = rng.choice([Decimal("0.01"), Decimal("0.25"), Decimal("1.00")])
+        bid_count = rng.choice([0, 0, 1, 5])
+        price = cents(1, 2000)
+        users = rng.sample(range(1, 10), rng.randint(0, 5))
+        leader_id = rng.choice([None, *users]) if bid_count else None
+        if bid_count and leader_id is None and rng.random() < 0.5:
+            # A leader without a maximum
+            leader_id = 99
+        proxies = [Proxy(user_id, cents(1, 3000)) for user_id in users]
+        return price, bid_count, leader_id, proxies, increment
+
+    def test_properties(self):
+        rng = random.Random(23)
+        for trial in range(self.TRIALS):
+            state = self.random_state(rng)
+            price, bid_count, leader_id, proxies, increment = state
+            with self.subTest(trial=trial, state=state):
+                bids = resolve(*state)
+                self.assertLessEqual(len(bids), 2)
+                maxima = {proxy.user_id: proxy.amount for proxy in proxies}
+                if leader_id is not None:
+                    maxima[leader_id] = max(price, maxima.get(leader_id, price))
+                minimum = price + increment if bid_count else price
+                previous = price
+                for index, (user_id, bid) in enumerate(bids):
+                    # Nobody is bid past their maximum, and every bid raises the price
+                    self.assertLessEqual(bid, maxima[user_id])
+                    if index == 0 and user_id != leader_id:
+                        self.assertGreaterEqual(bid, minimum)
+                    else:
+                        self.assertGreater(bid, previous)
+                    previous = bid
+                if not bids:
+                    self.assertEqual(bid_war(*state), (leader_id, price))
+                    continue
+                # The highest maximum wins, the standing leader and then the
+                # earliest maximum on a tie
+                winner, final = bids[-1]
+                order = [leader_id] + [proxy.user_id for proxy in proxies]
+                best = max(
+                    maxima.items(), key=lambda item: (item[1], -order.index(item[0]))
+                )
+                self.assertEqual(winner, best[0])
+                # Settling again changes nothing
+                self.assertEqual(
+                    resolve(final, bid_count + len(bids), winner, proxies, increment),
+                    [],
+                )
+                # A war of minimal bids, stepping from the standing price, ends on
+                # the same winner when the runner-up's maximum is at least one
+                # increment lower, within an increment of the runner-up's maximum
+                others = [
+                    amount for user_id, amount in maxima.items() if user_id != winner
+                ]
+                if not others or max(others) + increment <= maxima[winner]:
+                    war_winner, war_price = bid_war(*state)
+                    self.assertEqual(war_winner, winner)
+                    self.assertGreaterEqual(final, war_price)
+                    self.assertLess(final, war_price + 2 * increment)
+
+
+class ProxyBiddingTests(TestCase):
+    """Maximum bids answer new bids in the same transaction with few rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+        cls.listing = Listing.objects.create(
+            user=cls.seller, title="Lamp", starting_price=Decimal("5.00")
+        )
+
+    def assert_consistent(self):
+        """The listing columns match the bid table, whose prices only go up."""
+        self.listing.refresh_from_db()
+        bids = list(self.listing.bids.order_by("id"))
+        prices = [bid.price for bid in bids]
+        self.assertEqual(prices, sorted(set(prices)))
+        self.assertEqual(self.listing.bid_count, len(bids))
+        if bids:
+            self.assertEqual(self.listing.current_price, bids[-1].price)
+            self.assertEqual(self.listing.high_bidder_id, bids[-1].user_id)
+
+    def test_maximums_settle_in_one_pass(self):
+        result = set_max_bid(self.listing.id, self.alice, Decimal("20.00"))
+        self.assertEqual((result.status, result.price), (ACCEPTED, Decimal("5.00")))
+        result = set_max_bid(self.listing.id, self.bob, Decimal("15.00"))
+        self.assertEqual((result.status, result.price), (OUTBID, Decimal("15.01")))
+        self.assertEqual(
+            list(self.listing.bids.order_by("id").values_list("user", "price")),
+            [
+                (self.alice.id, Decimal("5.00")),
+                (self.bob.id, Decimal("15.00")),
+                (self.alice.id, Decimal("15.01")),
+            ],
+        )
+        # A manual bid is answered by the maximum straight away
+        result = place_bid(self.listing.id, self.bob, Decimal("18.00"))
+        self.assertEqual((result.status, result.price), (OUTBID, Decimal("18.01")))
+        self.assertEqual(result.bid.price, Decimal("18.00"))
+        # ...until it reaches the maximum: the manual bid stands first at that
+        # price, so it keeps the tie against the earlier maximum
+        result = place_bid(self.listing.id, self.bob, Decimal("20.00"))
+        self.assertEqual((result.status, result.price), (ACCEPTED, Decimal("20.00")))
+        result = place_bid(self.listing.id, self.bob, Decimal("25.00"))
+        self.assertEqual((result.status, result.price), (ACCEPTED, Decimal("25.00")))
+        self.assert_consistent()
+        self.assertEqual(self.listing.high_bidder, self.bob)
+
+    def test_random_bidding_stays_consistent(self):
+        rng = random.Random(7)
+        users = [self.alice, self.bob, User.objects.create_user("carol")]
+        for step in range(60):
+            user = rng.choice(users)
+            price = self.listing.current_price + Decimal(rng.randint(-50, 300)) / 100
+            with self.subTest(step=step):
+                if rng.random() < 0.4:
+                    result = set_max_bid(self.listing.id, user, price)
+                else:
+                    result = place_bid(self.listing.id, user, price)
+                self.assertIn(result.status, (ACCEPTED, OUTBID, TOO_LOW))
+                self.assert_consistent()
+                # Only the leader's maximum can be above the price
+                self.assertFalse(
+                    MaxBid.objects.filter(
+                        listing=self.listing, amount__gt=self.listing.current_price
+                    )
+                    .exclude(user=self.listing.high_bidder_id)
+                    .exists()
+                )
+
+    def test_listing_page_registers_maximum(self):
+        self.client.force_login(self.alice)
+        self.client.post(
+            reverse("listing", args=[self.listing.id]),
+            {"price": "30.00", "maximum": "on"},
+        )
+        self.assertEqual(
+            MaxBid.objects.get(listing=self.listing, user=self.alice).amount,
+            Decimal("30.00"),
+        )
+        self.assertEqual(self.listing.bids.get().price, Decimal("5.00"))
+
+
+class UserActivityTests(TestCase):
+    """Bids and closing keep each user's activity summary current."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+        cls.lamp, cls.desk = (
+            Listing.objects.create(
+                user=cls.seller, title=title, starting_price=Decimal("5.00")
+            )
+            for title in ("Lamp", "Desk")
+        )
+
+    def summary(self, user: User) -> dict:
+        activity = UserActivity.objects.get(pk=user.pk)
+        return {
+            "bid_count": activity.bid_count,
+            "winning": activity.winning,
+            "outbid": activity.outbid,
+            "won": activity.won,
+            "lost": activity.lost,
+            "listings": activity.listings,
+        }
+
+    def test_bids_and_closing_update_summaries(self):
+        place_bid(self.lamp.id, self.alice, Decimal("6.00"))
+        place_bid(self.desk.id, self.alice, Decimal("6.00"))
+        place_bid(self.lamp.id, self.bob, Decimal("7.00"))
+        self.assertEqual(
+            self.summary(self.alice),
+            {
+                "bid_count": 2,
+                "winning": [self.desk.id],
+                "outbid": [self.lamp.id],
+                "won": [],
+                "lost": [],
+                "listings": [],
+            },
+        )
+        close_listings([self.lamp.id, self.desk.id])
+        self.assertEqual(self.summary(self.alice)["won"], [self.desk.id])
+        self.assertEqual(self.summary(self.alice)["lost"], [self.lamp.id])
+        self.assertEqual(self.summary(self.bob)["won"], [self.lamp.id])
+        self.assertEqual(
+            self.summary(self.seller)["listings"], [self.lamp.id, self.desk.id]
+        )
+
+    def test_rebuild_matches_incremental_updates(self):
+        rng = random.Random(24)
+        users = [self.alice, self.bob, User.objects.create_user("carol")]
+        for _ in range(40):
+            listing = rng.choice([self.lamp, self.desk])
+            listing.refresh_from_db()
+            price = listing.current_price + Decimal(rng.randint(1, 300)) / 100
+            if rng.random() < 0.3:
+                set_max_bid(listing.id, rng.choice(users), price)
+            else:
+                place_bid(listing.id, rng.choice(users), price)
+        close_listings([self.lamp.id])
+        incremental = {user.pk: self.summary(user) for user in users}
+        call_command("rebuild_user_activity", stdout=StringIO())
+        for user in users:
+            with self.subTest(user=user.username):
+                rebuilt = self.summary(user)
+                self.assertEqual(
+                    rebuilt["bid_count"], incremental[user.pk]["bid_count"]
+                )
+                for name in ("winning", "outbid", "won", "lost", "listings"):
+                    self.assertCountEqual(rebuilt[name], incremental[user.pk][name])
+
+    def test_migration_backfills_existing_users(self):
+        place_bid(self.lamp.id, self.alice, Decimal("6.00"))
+        place_bid(self.lamp.id, self.bob, Decimal("7.00"))
+        close_listings([self.lamp.id])
+        expected = {user.pk: self.summary(user) for user in (self.alice, self.bob)}
+        UserActivity.objects.all().delete()
+        migration = importlib.import_module(
+            "auctions.migrations.0021_backfill_user_activity"
+        )
+        state = MigrationLoader(connection).project_state(
+            ("auctions", "0021_backfill_user_activity")
+        )
+        migration.backfill_activity(state.apps, None)
+        for user in (self.alice, self.bob):
+            self.assertEqual(self.summary(user), expected[user.pk])
+
+    def test_page_reads_one_summary(self):
+        self.client.force_login(self.alice)
+        url = reverse("activity")
+        for count in (1, 20):
+            for i in range(count):
+                place_bid(self.lamp.id, self.alice, Decimal("10.00") + Decimal(i))
+                place_bid(self.lamp.id, self.bob, Decimal("10.50") + Decimal(i))
+            # Session, user, summary and the listings on the page
+            with self.assertNumQueries(4):
+                response = self.client.get(url, {"section": "outbid"})
+            self.assertEqual(response.context["listings"], [self.lamp])
+        response = self.client.get(url, {"section": "winning"})
+        self.assertEqual(response.context["listings"], [])
+
+
+class CategoryCountTests(TestCase):
+    """The cached active listing count follows listings between categories."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller")
+        cls.books = Category.objects.create(name="Books")
+        cls.games = Category.objects.create(name="Games")
+
+    def assertCounts(self, books: int, games: int) -> None:
+        self.books.refresh_from_db()
+        self.games.refresh_from_db()
+        self.assertEqual(
+            (self.books.active_listing_count, self.games.active_listing_count),
+            (books, games),
+        )
+
+    def test_create_recategorize_close_and_delete(self):
+        listing = Listing.objects.create(
+            user=self.user, title="Chess", category=self.books
+        )
+        Listing.objects.create(user=self.user, title="Go", category=self.games)
+        self.assertCounts(1, 1)
+        listing.category = self.games
+        listing.save()
+        self.assertCounts(0, 2)
+        listing = Listing.objects.get(pk=listing.pk)
+        listing.active = False
+        listing.save()
+        self.assertCounts(0, 1)
+        Listing.objects.filter(category=self.games).delete()
+        self.assertCounts(0, 0)
+
+    def test_categories_page_is_a_single_query(self):
+        for i in range(5):
+            Listing.objects.create(
+                user=self.user, title=f"Book {i}", category=self.books
+            )
+        self.client.force_login(self.user)
+        # Session, user and categories
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("categories"))
+        self.assertContains(response, "Books (5)")
+
+
+class ListingCardCacheTests(TestCase):
+    """Cached listing cards are re-rendered once the listing changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.listing = Listing.objects.create(
+            user=cls.seller, title="Clock", starting_price=Decimal("3.00")
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.bidder)
+
+    def test_bid_and_edit_invalidate_card(self):
+        self.assertContains(self.client.get(reverse("index")), "$3.00")
+        place_bid(self.listing.id, self.bidder, Decimal("4.25"))
+        self.assertContains(self.client.get(reverse("index")), "$4.25")
+        listing = Listing.objects.get(pk=self.listing.id)
+        listing.title = "Grandfather clock"
+        listing.save()
+        self.assertContains(self.client.get(reverse("index")), "Grandfather clock")
+
+    def test_unchanged_card_is_served_from_cache(self):
+        self.client.get(reverse("index"))
+        # Change the row behind the cache's back: the stale card is still served
+        Listing.objects.filter(pk=self.listing.id).update(title="Sundial")
+        self.assertContains(self.client.get(reverse("index")), "Clock")
+
+
+class SearchTests(TestCase):
+    """Search ranks title matches first and follows listing edits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller")
+        cls.lamp = Listing.objects.create(
+            user=cls.user, title="Brass lamp", description="A desk lamp"
+        )
+        cls.desk = Listing.objects.create(
+            user=cls.user, title="Oak desk", description="Fits a brass lamp"
+        )
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(search("lamp", 10), [self.lamp.id, self.desk.id])
+        self.assertEqual(search("oak de", 10), [self.desk.id])
+        self.assertEqual(search('"(*', 10), [])
+
+    def test_index_follows_edits_closes_and_deletes(self):
+        self.lamp.title = "Floor light"
+        self.lamp.save()
+        self.assertEqual(search("floor", 10), [self.lamp.id])
+        self.desk.active = False
+        self.desk.save(update_fields=["active"])
+        self.assertEqual(search("lamp", 10), [self.lamp.id])
+        self.lamp.delete()
+        self.assertEqual(search("floor", 10), [])
+
+    def test_search_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("search"), {"q": "desk"})
+        self.assertEqual(
+            [listing.id for listing in response.context["listings"]],
+            [self.desk.id, self.lamp.id],
+        )
+
+
+class ListingFilterTests(TestCase):
+    """Feed filters and sorts run in SQL and are served by indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.books = Category.objects.create(name="Books")
+        cls.cheap, cls.mid, cls.dear = (
+            Listing.objects.create(
+                user=cls.seller,
+                title=f"Item {price}",
+                category=cls.books if price > 5 else None,
+                starting_price=Decimal(price),
+            )
+            for price in (1, 10, 100)
+        )
+        place_bid(cls.cheap.id, cls.bidder, Decimal(2))
+        place_bid(cls.cheap.id, cls.bidder, Decimal(3))
+
+    def filter(self, **params) -> list[int]:
+        listings, ordering = ListingFilterForm(params).filter(Listing.objects.all())
+        return list(listings.order_by(*ordering).values_list("id", flat=True))
+
+    def test_filters_and_sorts(self):
+        cheap, mid, dear = self.cheap.id, self.mid.id, self.dear.id
+        self.assertEqual(self.filter(sort="price_low"), [cheap, mid, dear])
+        self.assertEqual(self.filter(sort="price_high"), [dear, mid, cheap])
+        self.assertEqual(self.filter(sort="most_bids")[0], cheap)
+        self.assertEqual(self.filter(min_price="3", max_price="10"), [mid, cheap])
+        self.assertEqual(
+            self.filter(category=self.books.id, sort="price_low"), [mid, dear]
+        )
+        self.assertEqual(
+            self.filter(min_price="oops", sort="bogus"), [dear, mid, cheap]
+        )
+        self.assertEqual(self.filter(status="ended"), [])
+
+    def test_no_full_table_scans(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN output is SQLite specific")
+        cases = [
+            {"sort": sort, **filters}
+            for sort in ListingFilterForm.ORDERINGS
+            for filters in ({}, {"min_price": "5"}, {"category": self.books.id})
+        ]
+        for params in cases:
+            with self.subTest(**params):
+                listings, ordering = ListingFilterForm(params).filter(
+                    Listing.objects.all()
+                )
+                plan = listings.order_by(*ordering)[:25].explain()
+                self.assertIsNone(
+                    re.search(r"SCAN auctions_listing$", plan, re.MULTILINE), plan
+                )
+
+
+class ClosingTests(TestCase):
+    """Expired listings are closed in batches with their winners recorded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.books = Category.objects.create(name="Books")
+        cls.expired = [
+            Listing.objects.create(
+                user=cls.seller, title=f"Expired {i}", category=cls.books
+            )
+            for i in range(5)
+        ]
+        cls.running = Listing.objects.create(
+            user=cls.seller,
+            title="Running",
+            category=cls.books,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+        place_bid(cls.expired[0].id, cls.bidder, Decimal("2.00"))
+        Listing.objects.filter(title__startswith="Expired").update(
+            ends_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_sweep_closes_only_expired_listings(self):
+        self.assertEqual(close_expired_listings(batch_size=2), 5)
+        self.assertEqual(
+            set(Listing.objects.active().values_list("id", flat=True)),
+            {self.running.id},
+        )
+        first = Listing.objects.get(pk=self.expired[0].id)
+        self.assertEqual(first.winner, self.bidder)
+        self.assertIsNotNone(first.closed_at)
+        self.assertEqual(first.version, 2)
+        self.books.refresh_from_db()
+        self.assertEqual(self.books.active_listing_count, 1)
+        self.assertEqual(close_expired_listings(), 0)
+
+    def test_bids_after_end_are_rejected(self):
+        result = place_bid(self.expired[1].id, self.bidder, Decimal("5.00"))
+        self.assertEqual(result.status, CLOSED)
+
+    def test_admin_closes_through_close_listings(self):
+        admin = User.objects.create_superuser("admin")
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:auctions_listing_changelist"),
+            {"action": "close", "_selected_action": [self.expired[0].id]},
+        )
+        self.assertEqual(response.status_code, 302)
+        first = Listing.objects.get(pk=self.expired[0].id)
+        self.assertEqual(first.winner, self.bidder)
+        self.assertEqual(UserActivity.objects.get(pk=self.bidder.pk).won, [first.id])
+        # The change form cannot reopen or close a listing behind the activity's back
+        response = self.client.get(
+            reverse("admin:auctions_listing_change", args=[first.id])
+        )
+        self.assertNotContains(response, 'name="active"')
+
+
+class BidArchiveTests(TestCase):
+    """Bids of long-closed listings move to the archive, all but the winning one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+        cls.old, cls.recent = (
+            Listing.objects.create(user=cls.seller, title=title)
+            for title in ("Old", "Recent")
+        )
+        for listing in (cls.old, cls.recent):
+            place_bid(listing.id, cls.alice, Decimal("2.00"))
+            place_bid(listing.id, cls.bob, Decimal("3.00"))
+            place_bid(listing.id, cls.alice, Decimal("4.00"))
+        close_listings([cls.old.id, cls.recent.id])
+        Listing.objects.filter(pk=cls.old.id).update(
+            closed_at=timezone.now() - timedelta(days=100)
+        )
+
+    def test_keeps_winning_bid_and_archives_the_rest(self):
+        bids = list(Bid.objects.filter(listing=self.old).order_by("id"))
+        self.assertEqual(archive_closed_listings(days=90)[:2], (1, 2))
+        self.assertEqual(
+            list(Bid.objects.filter(listing=self.old).values_list("price", flat=True)),
+            [Decimal("4.00")],
+        )
+        self.assertEqual(Bid.objects.filter(listing=self.recent).count(), 3)
+        archived = BidArchive.objects.get(listing=self.old).bids()
+        self.assertEqual(
+            [(bid.id, bid.user_id, bid.price, bid.placed) for bid in archived],
+            [(bid.id, bid.user_id, bid.price, bid.placed) for bid in bids[:2]],
+        )
+        self.assertEqual(archive_closed_listings(days=90), (0, 0, 0))
+
+    def test_stats_and_activity_count_archived_bids(self):
+        before = {
+            user.pk: UserActivity.objects.get(pk=user.pk)
+            for user in (self.alice, self.bob)
+        }
+        archive_closed_listings(days=90)
+        call_command("recompute_listing_stats", stdout=StringIO())
+        old = Listing.objects.get(pk=self.old.id)
+        self.assertEqual((old.bid_count, old.current_price), (3, Decimal("4.00")))
+        self.assertEqual(old.high_bidder, self.alice)
+        # The rebuild reads the bidders table and never decodes an archive
+        with mock.patch("zlib.decompress", side_effect=AssertionError):
+            call_command("rebuild_user_activity", stdout=StringIO())
+        for user in (self.alice, self.bob):
+            with self.subTest(user=user.username):
+                activity = UserActivity.objects.get(pk=user.pk)
+                self.assertEqual(activity.bid_count, before[user.pk].bid_count)
+                self.assertCountEqual(activity.won, before[user.pk].won)
+                self.assertCountEqual(activity.lost, before[user.pk].lost)
+
+    def test_migration_backfills_bidders(self):
+        archive_closed_listings(days=90)
+        expected = list(
+            ArchivedBidder.objects.order_by("user").values_list(
+                "archive", "user", "bid_count", "last_bid"
+            )
+        )
+        ArchivedBidder.objects.all().delete()
+        migration = importlib.import_module("auctions.migrations.0020_archived_bidder")
+        migration.backfill_bidders(django_apps, None)
+        self.assertEqual(
+            list(
+                ArchivedBidder.objects.order_by("user").values_list(
+                    "archive", "user", "bid_count", "last_bid"
+                )
+            ),
+            expected,
+        )
+        self.assertEqual([count for _, _, count, _ in expected], [1, 1])
+
+    def test_highest_bid_uses_listing_price_index(self):
+        query = str(
+            Bid.objects.filter(listing=self.old).order_by("-price", "placed")[:1].query
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {query}")
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("bid_listing_price_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class ListingEventsTests(TestCase):
+    """Listing updates reach stream subscribers."""
+
+    async def test_broker_delivers_messages_across_threads(self):
+        broker = InProcessBroker()
+        messages = broker.listen("listing:1", heartbeat=0.01)
+        # Subscribed as soon as `listen()` returns, before the first read
+        await asyncio.to_thread(broker.publish, "listing:1", {"event": "first"})
+        self.assertEqual(await anext(messages), {"event": "first"})
+        self.assertIsNone(await anext(messages))
+        await asyncio.to_thread(broker.publish, "listing:1", {"event": "bid"})
+        await asyncio.to_thread(broker.publish, "listing:2", {"event": "other"})
+        self.assertEqual(await anext(messages), {"event": "bid"})
+        await messages.aclose()
+        self.assertEqual(broker._subscribers, {})
+
+    def test_publish_waits_for_commit(self):
+        seller = User.objects.create_user("seller")
+        bidder = User.objects.create_user("bidder")
+        listing = Listing.objects.create(user=seller, title="Vase")
+        published = []
+        broker = InProcessBroker()
+        broker.publish = lambda channel, message: published.append(message)
+        with mock.patch("auctions.events.get_broker", return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(listing.id, bidder, Decimal("1.00"))
+                self.assertEqual(published, [])
+        self.assertEqual(published[0]["bid_count"], 1)
+        self.assertEqual(published[0]["high_bidder"], "bidder")
+
+    async def test_stream_of_closed_listing(self):
+        seller = await User.objects.acreate(username="seller")
+        listing = await Listing.objects.acreate(user=seller, title="Vase")
+        await sync_to_async(close_listings)([listing.id])
+        await self.async_client.aforce_login(seller)
+        response = await self.async_client.get(
+            reverse("listing_events", args=[listing.id])
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(
+            [event.split("\n")[0] for event in events],
+            ["event: bid", "event: closed"],
+        )
+        self.assertEqual(json.loads(events[0].split("data: ")[1])["bid_count"], 0)
+        self.assertEqual(get_broker()._subscribers, {})
+
+    async def test_listing_page_streams_only_under_asgi(self):
+        seller = await User.objects.acreate(username="seller")
+        listing = await Listing.objects.acreate(user=seller, title="Vase")
+        url = reverse("listing", args=[listing.id])
+        events_url = reverse("listing_events", args=[listing.id])
+        await self.async_client.aforce_login(seller)
+        response = await self.async_client.get(url)
+        self.assertContains(response, "new EventSource")
+        # A WSGI worker would be held for as long as the page stays open
+        await sync_to_async(self.client.force_login)(seller)
+        response = await sync_to_async(self.client.get)(url)
+        self.assertNotContains(response, "new EventSource")
+        response = await sync_to_async(self.client.get)(events_url)
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(AUCTIONS_WATCHLIST_CACHE_TIMEOUT=3600)
+class WatchlistTests(TestCase):
+    """Watch checks use a cached id set that toggling keeps current."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.watcher = User.objects.create_user("watcher")
+        cls.listing = Listing.objects.create(user=cls.seller, title="Globe")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.watcher)
+
+    def test_toggle_updates_cached_ids(self):
+        self.assertEqual(self.watcher.watched_listing_ids(), frozenset())
+        url = reverse("toggle_watchlist", args=[self.listing.id])
+        self.client.post(url)
+        self.assertEqual(self.watcher.watched_listing_ids(), {self.listing.id})
+        self.client.post(url)
+        self.assertEqual(self.watcher.watched_listing_ids(), frozenset())
+        self.watcher.watchlist.add(self.listing)
+        self.assertEqual(self.watcher.watched_listing_ids(), {self.listing.id})
+
+    def test_clearing_watchers_updates_cached_ids(self):
+        self.watcher.watchlist.add(self.listing)
+        self.assertEqual(self.watcher.watched_listing_ids(), {self.listing.id})
+        self.listing.watchers.clear()
+        self.assertEqual(self.watcher.watched_listing_ids(), frozenset())
+
+    @override_settings(AUCTIONS_WATCHLIST_CACHE_TIMEOUT=0)
+    def test_uncached_ids_are_read_each_time(self):
+        self.watcher.watchlist.add(self.listing)
+        cache.set(watchlist_cache_key(self.watcher.pk), frozenset())
+        self.assertEqual(self.watcher.watched_listing_ids(), {self.listing.id})
+
+    def test_cached_ids_skip_the_database(self):
+        self.watcher.watchlist.add(self.listing)
+        self.watcher.watched_listing_ids()
+        with self.assertNumQueries(0):
+            self.assertIn(self.listing.id, self.watcher.watched_listing_ids())
+
+    def test_listing_page_shows_watch_state(self):
+        self.watcher.watchlist.add(self.listing)
+        response = self.client.get(reverse("listing", args=[self.listing.id]))
+        self.assertContains(response, "Remove from Watchlist")
+
+
+@override_settings(AUCTIONS_METRICS_SAMPLE_RATE=1.0)
+class QueryMetricsTests(TestCase):
+    """Sampled requests report their timings and feed the metrics views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("staff", is_staff=True)
+
+    def setUp(self):
+        metrics.install(connection)
+        metrics.registry.reset()
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_prometheus_report(self):
+        response = self.client.get(reverse("index"))
+        self.assertRegex(
+            response["Server-Timing"],
+            r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries, 0 duplicates"',
+        )
+        stats = metrics.registry.snapshot()["index"]
+        self.assertEqual(stats.requests, 1)
+        self.assertGreater(stats.queries, 0)
+        report = self.client.get(reverse("metrics"), {"format": "prometheus"})
+        self.assertContains(report, 'auctions_view_requests_total{view="index"} 1')
+
+    def test_metrics_page_is_staff_only(self):
+        self.client.force_login(User.objects.create_user("bidder"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(AUCTIONS_METRICS_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("index")))
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged pages are answered with 304 until a bid, comment or watch changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.listing = Listing.objects.create(
+            user=cls.seller, title="Lamp", starting_price=Decimal("5.00")
+        )
+
+    def setUp(self):
+        self.client.force_login(self.bidder)
+
+    def revalidate(self, url: str, response) -> int:
+        return self.client.get(
+            url,
+            headers={
+                "if-none-match": response["ETag"],
+                "if-modified-since": response["Last-Modified"],
+            },
+        ).status_code
+
+    def test_listing_page(self):
+        url = reverse("listing", args=[self.listing.id])
+        response = self.client.get(url)
+        # Only the session, its user and the timestamp are read for a 304
+        with self.assertNumQueries(3):
+            self.assertEqual(self.revalidate(url, response), 304)
+        changes = [
+            lambda: place_bid(self.listing.id, self.bidder, Decimal("6.00")),
+            lambda: Comment.objects.create(
+                user=self.bidder, listing=self.listing, text="Still available?"
+            ),
+            lambda: self.client.post(
+                reverse("toggle_watchlist", args=[self.listing.id])
+            ),
+            lambda: self.client.post(
+                reverse("toggle_watchlist", args=[self.listing.id])
+            ),
+        ]
+        for change in changes:
+            change()
+            self.assertEqual(self.revalidate(url, response), 200)
+            response = self.client.get(url)
+            self.assertEqual(self.revalidate(url, response), 304)
+
+    def test_feeds(self):
+        for url in (reverse("index"), reverse("watchlist")):
+            response = self.client.get(url)
+            self.assertEqual(self.revalidate(url, response), 304)
+            # Other filters get their own ETag
+            self.assertEqual(self.revalidate(url + "?sort=price_low", response), 200)
+        response = self.client.get(reverse("index"))
+        close_listings([self.listing.id])
+        self.assertEqual(self.revalidate(reverse("index"), response), 200)
+
+
+class ApiTests(TestCase):
+    """The JSON API serves sparse fieldsets, cursor pages and bulk lookups."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.category = Category.objects.create(name="Lighting")
+        cls.listings = [
+            Listing.objects.create(
+                user=cls.seller,
+                category=cls.category,
+                title=f"Lamp {i}",
+                starting_price=Decimal("5.00"),
+            )
+            for i in range(3)
+        ]
+        place_bid(cls.listings[0].id, cls.bidder, Decimal("7.50"))
+
+    def setUp(self):
+        self.client.force_login(self.bidder)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("api_listings"))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("error", response.json())
+
+    def test_pages_cover_feed_with_selected_fields(self):
+        seen = []
+        url = reverse("api_listings") + "?size=2&fields=id,price,high_bidder"
+        while url:
+            data = self.client.get(url).json()
+            for row in data["results"]:
+                self.assertEqual(set(row), {"id", "price", "high_bidder"})
+            seen.extend(row["id"] for row in data["results"])
+            url = data["next"]
+        self.assertEqual(seen, [listing.id for listing in reversed(self.listings)])
+        row = self.client.get(
+            reverse("api_listing", args=[self.listings[0].id]),
+            {"fields": "price,high_bidder,seller,category"},
+        ).json()
+        self.assertEqual(
+            row,
+            {
+                "price": "7.50",
+                "high_bidder": "bidder",
+                "seller": "seller",
+                "category": self.category.id,
+            },
+        )
+
+    def test_sparse_fields_skip_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("api_listings"), {"fields": "id,title"})
+        self.assertNotIn("JOIN", queries[-1]["sql"])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("api_listings"), {"fields": "id,high_bidder"})
+        self.assertEqual(queries[-1]["sql"].count("JOIN"), 1)
+
+    def test_bulk_lookup_keeps_requested_order(self):
+        ids = [self.listings[2].id, 0, self.listings[0].id]
+        response = self.client.get(
+            reverse("api_listings"), {"ids": ",".join(map(str, ids)), "fields": "id"}
+        )
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.listings[2].id}, {"id": self.listings[0].id}],
+        )
+
+    def test_errors(self):
+        for params in ({"fields": "id,password"}, {"ids": "1,x"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("api_listings"), params)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("api_listing", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_categories(self):
+        data = self.client.get(reverse("api_categories")).json()
+        self.assertEqual(
+            data["results"],
+            [
+                {
+                    "id": self.category.id,
+                    "name": "Lighting",
+                    "image_url": "",
+                    "active_listing_count": 3,
+                }
+            ],
+        )
+
+
+class BatchBidTests(TestCase):
+    """Batches of bids are checked in one query and applied per listing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller")
+        cls.bidder = User.objects.create_user("bidder")
+        cls.lamp, cls.desk = (
+            Listing.objects.create(
+                user=cls.seller, title=title, starting_price=Decimal("5.00")
+            )
+            for title in ("Lamp", "Desk")
+        )
+
+    def setUp(self):
+        self.client.force_login(self.bidder)
+
+    def post(self, bids):
+        return self.client.post(
+            reverse("api_bids"), {"bids": bids}, content_type="application/json"
+        )
+
+    def test_posts_need_the_csrf_token_of_an_api_response(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.bidder)
+        bids = {"bids": [{"listing": self.lamp.id, "price": "6.00"}]}
+        url = reverse("api_bids")
+        response = client.post(url, bids, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+        token = client.get(reverse("api_categories")).cookies["csrftoken"].value
+        response = client.post(
+            url, bids, content_type="application/json", headers={"X-CSRFToken": token}
+        )
+        self.assertEqual(response.json()["results"][0]["status"], ACCEPTED)
+
+    def test_results_follow_request_order(self):
+        response = self.post(
+            [
+                {"listing": self.lamp.id, "price": "6.00"},
+                {"listing": self.desk.id, "price": "4.00"},
+                {"listing": self.lamp.id, "price": "6.00"},
+                {"listing": self.lamp.id, "price": "8.00"},
+                {"listing": 0, "price": "9.00"},
+                {"listing": self.desk.id, "price": "lots"},
+            ]
+        )
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            [ACCEPTED, TOO_LOW, TOO_LOW, ACCEPTED, NOT_FOUND, "invalid"],
+        )
+        self.assertEqual(results[3]["price"], "8.00")
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.lamp.current_price, Decimal("8.00"))
+        self.assertEqual(self.lamp.bid_count, 2)
+        self.assertEqual(self.lamp.high_bidder, self.bidder)
+        self.assertEqual(
+            set(Bid.objects.values_list("id", flat=True)),
+            {results[0]["bid"], results[3]["bid"]},
+        )
+
+    def test_rejected_batch_reads_listings_once(self):
+        bids = [
+            {"listing": listing.id, "price": "1.00"}
+            for listing in (self.lamp, self.desk)
+            for _ in range(50)
+        ]
+        self.post(bids)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(bids)
+        self.assertEqual(
+            len([query for query in queries if "auctions_listing" in query["sql"]]), 1
+        )
+        self.assertEqual(len(response.json()["results"]), 100)
+
+    def test_malformed_batches(self):
+        for body in ("not json", "[]", '{"bids": {}}'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    reverse("api_bids"), body, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400)
+        with self.settings(AUCTIONS_BID_BATCH_SIZE=1):
+            self.assertEqual(self.post([{}, {}]).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_bids")).status_code, 405)
+
+
+class VendorAssetTests(TestCase):
+    """Pinned vendor assets load locally once checked in and from their CDN before."""
+
+    def render(self) -> str:
+        return Template(
+            '{% load vendor_assets %}{% vendor_asset "bootstrap/bootstrap.min.css" %}'
+        ).render(Context())
+
+    def test_missing_copy_loads_from_cdn_with_integrity(self):
+        with mock.patch("auctions.vendor.is_vendored", return_value=False):
+            html = self.render()
+        asset = vendor.ASSETS["bootstrap/bootstrap.min.css"]
+        self.assertIn(f'href="{asset.url}"', html)
+        self.assertIn(f'integrity="{asset.integrity}"', html)
+
+    def test_checked_in_copy_loads_from_static_files(self):
+        with (
+            mock.patch("auctions.vendor.is_vendored", return_value=True),
+            mock.patch(
+                "auctions.templatetags.vendor_assets.static",
+                side_effect=lambda path: f"/static/{path}",
+            ),
+        ):
+            html = self.render()
+        self.assertEqual(
+            html,
+            '<link rel="stylesheet" '
+            'href="/static/auctions/vendor/bootstrap/bootstrap.min.css">',
+        )
+
+    def test_every_cdn_fallback_has_integrity(self):
+        with mock.patch("auctions.vendor.is_vendored", return_value=False):
+            html = self.client.get(reverse("login")).content.decode()
+        external = re.findall(
+            r'<(?:link|script) [^>]*(?:href|src)="https://[^>]*>', html
+        )
+        self.assertEqual(len(external), len(vendor.ASSETS))
+        for tag in external:
+            self.assertRegex(tag, r'integrity="sha384-[A-Za-z0-9+/]{64}"')
+
+    def test_icons_come_from_the_local_sprite(self):
+        html = Template(
+            '{% load icons %}{% icon "bookmark-check" title="Watched" %}'
+        ).render(Context())
+        self.assertRegex(
+            html,
+            r'<use href="/static/auctions/icons\.[0-9a-f]{12}\.svg#bookmark-check"',
+        )
+        self.assertIn("<title>Watched</title>", html)
+
+    def test_pages_use_hashed_static_names(self):
+        response = self.client.get(reverse("login"))
+        self.assertRegex(
+            response.content.decode(), r"/static/auctions/styles\.[0-9a-f]{12}\.css"
+        )
+
+
+class PurgeSessionsTests(TestCase):
+    """Expired sessions are deleted in batches and live ones are kept."""
+
+    def test_purges_only_expired_sessions(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"expired{i}", session_data="", expire_date=now
+            )
+        Session.objects.create(
+            session_key="live", session_data="", expire_date=now + timedelta(days=1)
+        )
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, stdout=out)
+        self.assertIn("5 expired session(s) purged", out.getvalue())
+        self.assertQuerySetEqual(
+            Session.objects.values_list("session_key", flat=True), ["live"]
+        )
+
+
+class StubImageHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a generated PNG at any path and counts the requests."""
+
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        buffer = BytesIO()
+        Image.new("RGBA", (800, 400), (200, 30, 30, 128)).save(buffer, "PNG")
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.end_headers()
+        self.wfile.write(buffer.getvalue())
+
+    def log_message(self, *args):
+        pass
+
+
+class ThumbnailTests(TestCase):
+    """Images are fetched once from their host and served resized from disk."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.image_url = f"http://127.0.0.1:{cls.server.server_port}/lamp.png"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        StubImageHandler.requests = 0
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            AUCTIONS_THUMBNAIL_DIR=directory.name,
+            AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        usage = mock.patch.multiple(thumbnails, cache_bytes=0, scanned_at=float("-inf"))
+        usage.start()
+        self.addCleanup(usage.stop)
+
+    def get(self, width: int, fmt: str, url: str | None = None):
+        return self.client.get(
+            thumbnails.thumbnail_url(url or self.image_url, width, fmt)
+        )
+
+    def test_variants_are_cached_after_one_fetch(self):
+        for width in thumbnails.WIDTHS:
+            for fmt, (pillow_format, content_type) in thumbnails.FORMATS.items():
+                response = self.get(width, fmt)
+                self.assertEqual(response["Content-Type"], content_type)
+                self.assertIn("immutable", response["Cache-Control"])
+                with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+                    self.assertEqual(image.format, pillow_format)
+                    self.assertEqual(image.size, (width, width // 2))
+        self.assertEqual(StubImageHandler.requests, 1)
+
+    def test_card_srcset_points_at_thumbnails(self):
+        user = User.objects.create_user("seller")
+        Listing.objects.create(user=user, title="Lamp", image_url=self.image_url)
+        self.client.force_login(user)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, 'type="image/webp"')
+        srcset = re.search(
+            r'<img src="[^"]+" srcset="([^"]+)"', response.content.decode()
+        )
+        url, density = srcset.group(1).split(", ")[1].split(" ")
+        self.assertEqual(density, "2x")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_least_recently_used_files_are_evicted(self):
+        self.get(150, "jpeg")
+        size = sum(
+            path.stat().st_size
+            for path in Path(django_settings.AUCTIONS_THUMBNAIL_DIR).glob("*/*")
+        )
+        other = self.image_url.replace("lamp", "desk")
+        os.utime(thumbnails.variant_path(self.image_url, 150, "jpeg"), (0, 0))
+        # Room for one image's variants and a half, so only the older one goes
+        with override_settings(AUCTIONS_THUMBNAIL_CACHE_BYTES=size * 3 // 2):
+            self.get(150, "jpeg", other)
+        self.assertFalse(thumbnails.variant_path(self.image_url, 150, "jpeg").exists())
+        self.assertTrue(thumbnails.variant_path(other, 150, "jpeg").exists())
+
+    def test_misses_under_the_limit_skip_scans(self):
+        with mock.patch.object(thumbnails, "evict", wraps=thumbnails.evict) as evict:
+            self.get(150, "jpeg")
+            self.get(150, "jpeg", self.image_url.replace("lamp", "desk"))
+        self.assertEqual(evict.call_count, 1)
+
+    def test_connects_to_the_address_it_checked(self):
+        port = self.server.server_port
+        url = f"http://images.example:{port}/lamp.png"
+        stub = (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))
+        public = (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.215.14", port))
+        # A second lookup, as a rebinding attack would answer it, fails the test
+        with mock.patch("socket.getaddrinfo", side_effect=[[stub], OSError]):
+            self.assertEqual(self.get(150, "jpeg", url).status_code, 200)
+        self.assertEqual(StubImageHandler.requests, 1)
+        with (
+            override_settings(AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS=False),
+            mock.patch("socket.getaddrinfo", return_value=[public, stub]),
+        ):
+            response = self.get(150, "jpeg", url.replace("lamp", "desk"))
+        self.assertRedirects(
+            response, url.replace("lamp", "desk"), fetch_redirect_response=False
+        )
+        self.assertEqual(StubImageHandler.requests, 1)
+
+    def test_rejects_unsigned_and_private_urls(self):
+        url = reverse("thumbnail", args=["forged:token", 150, "jpeg"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with override_settings(AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS=False):
+            response = self.get(150, "jpeg")
+        # Falls back to the original without fetching it
+        self.assertRedirects(response, self.image_url, fetch_redirect_response=False)
+        self.assertEqual(StubImageHandler.requests, 0)
+
+
+class ServerSettingsTests(SimpleTestCase):
+    """Persistent connections default by server interface, and never override."""
+
+    def conn_max_age(self, module: str, **env) -> int:
+        environ = dict(os.environ)
+        environ.pop("DB_CONN_MAX_AGE", None)
+        environ.update(env, DJANGO_SETTINGS_MODULE="commerce.settings")
+        script = (
+            f"import {module}\n"
+            "from django.conf import settings\n"
+            "print(settings.DATABASES['default']['CONN_MAX_AGE'])"
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", script],
+            cwd=django_settings.BASE_DIR,
+            env=environ,
+            text=True,
+        )
+        return int(output)
+
+    def test_defaults_by_interface(self):
+        self.assertEqual(self.conn_max_age("commerce.wsgi"), 600)
+        self.assertEqual(self.conn_max_age("commerce.asgi"), 0)
+
+    def test_explicit_value_wins(self):
+        self.assertEqual(self.conn_max_age("commerce.asgi", DB_CONN_MAX_AGE="60"), 60)
+        self.assertEqual(self.conn_max_age("commerce.wsgi", DB_CONN_MAX_AGE="0"), 0)
@@ -0,0 +1,257 @@
+"""Resized copies of remote listing and category images in a disk cache.
+
+Templates point `<img>` tags at the `thumbnail` view with a signed copy of the
+original URL (see `templatetags/thumbnails.py`), so the view only ever fetches
+URLs the site itself rendered. The first request for an image downloads it once
+and writes every width and format variant to `AUCTIONS_THUMBNAIL_DIR`; later
+requests are served from disk. When the cache grows past
+`AUCTIONS_THUMBNAIL_CACHE_BYTES` the least recently used files are evicted.
+
+Originals on private addresses are refused when the connection is opened: the
+host is resolved once, and the socket connects to an address that was checked,
+so DNS cannot point it somewhere else between the check and the fetch.
+"""
+
+import hashlib
+import http.client
+import ipaddress
+import os
+import socket
+import tempfile
+import time
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+# Square boxes the images are fitted into; the first matches the `.thumbnail`
+# CSS box and the others serve high-density screens
+WIDTHS = (150, 300)
+# URL suffix: (Pillow format, content type)
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+FETCH_TIMEOUT = 10
+# Thumbnail URLs embed the original URL, so responses can be cached for a year
+MAX_AGE = 365 * 24 * 60 * 60
+# Evict down to this fraction of the limit, so eviction does not run on every write
+EVICT_TO = 0.9
+# Seconds between scans of the cache while this process's estimate of its size
+# stays under the limit; other processes' writes are only seen by a scan
+SCAN_INTERVAL = 300
+
+# This process's estimate of the cache size and when it was last scanned
+cache_bytes = 0
+scanned_at = float("-inf")
+
+signer = signing.Signer(salt="auctions.thumbnails")
+
+
+class ThumbnailError(Exception):
+    """The original image could not be fetched or decoded."""
+
+
+def sign(url: str) -> str:
+    return signer.sign_object(url, compress=True)
+
+
+def unsign(token: str) -> str:
+    """Return the URL signed into `token`; raises `signing.BadSignature`."""
+    return signer.unsign_object(token)
+
+
+def thumbnail_url(url: str, width: int, fmt: str) -> str:
+    return reverse("thumbnail", args=[sign(url), width, fmt])
+
+
+def variant_path(url: str, width: int, fmt: str) -> Path:
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    return (
+        Path(settings.AUCTIONS_THUMBNAIL_DIR) / digest[:2] / f"{digest}-{width}.{fmt}"
+    )
+
+
+def open_thumbnail(url: str, width: int, fmt: str) -> BinaryIO:
+    """Return the cached variant of `url`, creating every variant on a miss."""
+    path = variant_path(url, width, fmt)
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        written = write_variants(url, fetch(url))
+        # An open file survives its eviction, by this request or another
+        file = open(path, "rb")
+        evict_if_full(written)
+        return file
+    # The modification time records the last use for the LRU eviction
+    os.utime(file.fileno())
+    return file
+
+
+def check_url(url: str) -> None:
+    """Refuse URLs that are not HTTP(S)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ThumbnailError(f"Not an HTTP URL: {url}")
+
+
+def public_addresses(host: str, port: int) -> list[tuple]:
+    """Resolve `host` for a TCP connection, refusing it if any address is private."""
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as error:
+        raise ThumbnailError(f"Cannot resolve {host}") from error
+    if not settings.AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS:
+        for *_, sockaddr in addresses:
+            if not ipaddress.ip_address(sockaddr[0]).is_global:
+                raise ThumbnailError(f"{host} is not a public host")
+    return addresses
+
+
+def connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source=None):
+    """Open a TCP connection to one of the checked addresses of `address`."""
+    error = None
+    for family, type_, proto, _, sockaddr in public_addresses(*address):
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source:
+                sock.bind(source)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            sock.close()
+            error = exc
+    raise error
+
+
+class CheckedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = connect_public
+
+
+class CheckedHTTPSConnection(http.client.HTTPSConnection):
+    # TLS is still verified against the host name
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = connect_public
+
+
+class CheckedHTTPHandler(urllib.request.HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(CheckedHTTPConnection, req, **kwargs)
+
+
+class CheckedHTTPSHandler(urllib.request.HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(CheckedHTTPSConnection, req, **kwargs)
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch(url: str) -> bytes:
+    """Download an original image, up to `AUCTIONS_THUMBNAIL_MAX_SOURCE_BYTES`."""
+    check_url(url)
+    limit = settings.AUCTIONS_THUMBNAIL_MAX_SOURCE_BYTES
+    # No proxy handler: connections go straight to the checked addresses
+    opener = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}),
+        CheckedHTTPHandler,
+        CheckedHTTPSHandler,
+        CheckedRedirectHandler,
+    )
+    request = urllib.request.Request(url, headers={"User-Agent": "commerce"})
+    try:
+        with opener.open(request, timeout=FETCH_TIMEOUT) as response:
+            data = response.read(limit + 1)
+    except OSError as error:
+        raise ThumbnailError(f"Cannot fetch {url}: {error}") from error
+    if len(data) > limit:
+        raise ThumbnailError(f"{url} is larger than {limit} bytes")
+    return data
+
+
+def write_variants(url: str, data: bytes) -> int:
+    """Write every width and format of the image `data` to the cache.
+
+    Return the number of bytes written.
+    """
+    try:
+        with Image.open(BytesIO(data)) as original:
+            original.load()
+            image = ImageOps.exif_transpose(original)
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ThumbnailError(f"Cannot decode {url}: {error}") from error
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    written = 0
+    for width in WIDTHS:
+        resized = image.copy()
+        # Fits inside the box without upscaling small originals
+        resized.thumbnail((width, width), Image.Resampling.LANCZOS)
+        for fmt, (pillow_format, _) in FORMATS.items():
+            variant = resized
+            if pillow_format == "JPEG" and has_alpha:
+                variant = Image.new("RGB", resized.size, "white")
+                variant.paste(resized, mask=resized.getchannel("A"))
+            path = variant_path(url, width, fmt)
+            save_atomically(variant, path, pillow_format)
+            written += path.stat().st_size
+    return written
+
+
+def save_atomically(image: Image.Image, path: Path, pillow_format: str) -> None:
+    # Readers see either no file or a complete one, never a partial write
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temp:
+        image.save(temp, pillow_format, quality=80)
+    os.replace(temp.name, path)
+
+
+def evict_if_full(written: int) -> None:
+    """Count `written` new bytes and evict if the cache may be over its limit.
+
+    The cache directory is only scanned once this process's estimate passes the
+    limit or `SCAN_INTERVAL` has passed since the last scan, not on every miss.
+    """
+    global cache_bytes
+    cache_bytes += written
+    if (
+        cache_bytes > settings.AUCTIONS_THUMBNAIL_CACHE_BYTES
+        or time.monotonic() - scanned_at >= SCAN_INTERVAL
+    ):
+        evict()
+
+
+def evict(limit: int | None = None) -> int:
+    """Delete least recently used files while the cache is over its size limit."""
+    global cache_bytes, scanned_at
+    if limit is None:
+        limit = settings.AUCTIONS_THUMBNAIL_CACHE_BYTES
+    files = []
+    for path in Path(settings.AUCTIONS_THUMBNAIL_DIR).glob("*/*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    evicted = 0
+    if total > limit:
+        for _, size, path in sorted(files):
+            if total <= limit * EVICT_TO:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+    cache_bytes, scanned_at = total, time.monotonic()
+    return evicted
@@ -2,10 +2,15 @@
 
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("activity", views.activity, name="activity"),
+    path("api/v1/bids", api.bids, name="api_bids"),
+    path("api/v1/categories", api.categories, name="api_categories"),
+    path("api/v1/listings", api.listings, name="api_listings"),
+    path("api/v1/listings/<int:listing_id>", api.listing, name="api_listing"),
     path("categories", views.categories, name="categories"),
     path("category/<int:category_id>", views.category, name="category"),
     path("close/<int:listing_id>", views.close_listing, name="close_listing"),
@@ -13,9 +18,21 @@ urlpatterns = [
     path("create_category", views.create_category, name="create_category"),
     path("create_listing", views.create_listing, name="create_listing"),
     path("listing/<int:listing_id>", views.listing, name="listing"),
+    path(
+        "listing/<int:listing_id>/events",
+        views.listing_events,
+        name="listing_events",
+    ),
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
+    path("metrics", views.metrics, name="metrics"),
     path("register", views.register, name="register"),
+    path("search", views.search, name="search"),
+    path(
+        "thumbnail/<str:token>/<int:width>.<str:fmt>",
+        views.thumbnail,
+        name="thumbnail",
+    ),
     path("watchlist", views.watchlist, name="watchlist"),
     path("watchlist/<int:listing_id>", views.toggle_watchlist, name="toggle_watchlist"),
 ]
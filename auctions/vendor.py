@@ -0,0 +1,45 @@
+"""Pinned third-party static assets: Bootstrap and jQuery.
+
+Pages serve each asset from our own static files once its copy is checked in
+under `VENDOR_DIR` (`manage.py vendor_static` downloads them), and from its
+pinned CDN URL until then, always with its subresource integrity hash. The
+`{% vendor_asset %}` template tag picks between the two.
+"""
+
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+VENDOR_DIR = Path(__file__).resolve().parent / "static" / "auctions" / "vendor"
+STATIC_PREFIX = "auctions/vendor/"
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A pinned file: where to download it and its integrity hash."""
+
+    url: str
+    integrity: str
+
+
+# Path under VENDOR_DIR: asset, with the hashes published in the Bootstrap 4.4 docs
+ASSETS = {
+    "bootstrap/bootstrap.min.css": Asset(
+        "https://cdn.jsdelivr.net/npm/bootstrap@4.4.1/dist/css/bootstrap.min.css",
+        "sha384-Vkoo8x4CGsO3+Hhxv8T/Q5PaXtkKtu6ug5TOeNV6gBiFeWPGFN9MuhOf23Q9Ifjh",
+    ),
+    "bootstrap/bootstrap.bundle.min.js": Asset(
+        "https://cdn.jsdelivr.net/npm/bootstrap@4.4.1/dist/js/bootstrap.bundle.min.js",
+        "sha384-6khuMg9gaYr5AxOqhkVIODVIvm9ynTT5J4V1cfthmT+emCG6yVmEZsRHdxlotUnm",
+    ),
+    "jquery/jquery.slim.min.js": Asset(
+        "https://code.jquery.com/jquery-3.4.1.slim.min.js",
+        "sha384-J6qa4849blE2+poT4WnyKhv5vZF5SrPo0iEjwBvKU7imGFAV0wwj1yYfoRSJoZ+n",
+    ),
+}
+
+
+@cache
+def is_vendored(name: str) -> bool:
+    """Whether the copy of asset `name` is checked in, so `collectstatic` serves it."""
+    return (VENDOR_DIR / name).is_file()
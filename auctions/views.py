@@ -1,19 +1,57 @@
 """Functions that support the various views for the auctions app."""
 
+import json
+
 from django import forms
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.signing import BadSignature
 from django.db import IntegrityError
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect, render
 from django.urls import reverse
-
-from .models import Bid, Category, Comment, Listing, User
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from . import thumbnails
+from .bidding import place_bid, set_max_bid
+from .closing import close_listings
+from .conditional import feed_condition, listing_condition
+from .events import get_broker, listing_channel, supports_streaming
+from .metrics import registry
+from .models import (
+    Bid,
+    Category,
+    Comment,
+    Listing,
+    User,
+    UserActivity,
+    watchlist_cache_key,
+)
+from .pagination import COMMENT_ORDERING, page_size, paginate, paginate_ids
+from .search import search as search_listings
 
 
 class BidForm(forms.ModelForm):
     """Form for adding a new bid on a listing."""
 
+    maximum = forms.BooleanField(
+        required=False,
+        label="Bid for me up to this amount when I am outbid",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
     class Meta:
         model = Bid
         fields = ["price"]
@@ -24,17 +62,18 @@ class BidForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
     def clean_price(self):
-        """Verify the price is the starting price or higher than the highest bid."""
+        """Verify the price is the starting price or higher than the highest bid.
+
+        This only gives early feedback; `place_bid()` re-checks under a lock.
+        """
         price = self.cleaned_data["price"]
-        highest_bid = self.listing.highest_bid()
-        if highest_bid:
-            current_price = highest_bid.price
+        current_price = self.listing.price()
+        if self.listing.num_bids():
             if price <= current_price:
                 raise forms.ValidationError(
                     f"Your bid must be higher than the current price (${current_price})."
                 )
         else:
-            current_price = self.listing.starting_price
             if price < current_price:
                 raise forms.ValidationError(
                     "Your bid must be higher than or equal to the starting price "
@@ -73,7 +112,117 @@ class ListingForm(forms.ModelForm):
 
     class Meta:
         model = Listing
-        fields = ["title", "category", "description", "image_url", "starting_price"]
+        fields = [
+            "title",
+            "category",
+            "description",
+            "image_url",
+            "starting_price",
+            "ends_at",
+        ]
+        labels = {"ends_at": "Ends at (optional)"}
+        widgets = {"ends_at": forms.DateTimeInput(attrs={"type": "datetime-local"})}
+
+    def clean_ends_at(self):
+        """Verify the end time, if any, is in the future."""
+        ends_at = self.cleaned_data["ends_at"]
+        if ends_at and ends_at <= timezone.now():
+            raise forms.ValidationError("The end time must be in the future.")
+        return ends_at
+
+
+class ListingFilterForm(forms.Form):
+    """Form for the filters and sort order of the listing feed."""
+
+    # Keyset orderings; each is served by one of the indexes on `Listing`
+    ORDERINGS = {
+        "newest": ("-created", "-id"),
+        "price_low": ("current_price", "id"),
+        "price_high": ("-current_price", "-id"),
+        "most_bids": ("-bid_count", "-id"),
+        "ending": ("ends_at", "id"),
+    }
+
+    status = forms.ChoiceField(
+        choices=[("active", "Active"), ("ended", "Ended")], required=False
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.order_by("name"), required=False
+    )
+    min_price = forms.DecimalField(
+        min_value=0, decimal_places=2, required=False, label="Min $"
+    )
+    max_price = forms.DecimalField(
+        min_value=0, decimal_places=2, required=False, label="Max $"
+    )
+    sort = forms.ChoiceField(
+        choices=[
+            ("newest", "Newest"),
+            ("price_low", "Price: low to high"),
+            ("price_high", "Price: high to low"),
+            ("most_bids", "Most bids"),
+            ("ending", "Ending soonest"),
+        ],
+        required=False,
+    )
+
+    def filter(self, listings):
+        """Return `listings` filtered in SQL plus the keyset ordering to page by.
+
+        Invalid values are ignored rather than rejected, so a bad query parameter
+        only drops that one filter.
+        """
+        self.is_valid()
+        data = self.cleaned_data
+        listings = listings.active(data.get("status") != "ended")
+        if data.get("category"):
+            listings = listings.filter(category=data["category"])
+        if data.get("min_price") is not None:
+            listings = listings.filter(current_price__gte=data["min_price"])
+        if data.get("max_price") is not None:
+            listings = listings.filter(current_price__lte=data["max_price"])
+        sort = data.get("sort") or "newest"
+        if sort == "ending":
+            listings = listings.filter(ends_at__isnull=False)
+        return listings, self.ORDERINGS[sort]
+
+
+# Sections of the activity page: the `UserActivity` list and its tab title
+ACTIVITY_SECTIONS = {
+    "winning": "Winning",
+    "outbid": "Outbid",
+    "won": "Won",
+    "lost": "Lost",
+    "listings": "Your Listings",
+}
+
+
+@login_required
+def activity(request: HttpRequest) -> HttpResponse:
+    """Render the user's bids, auctions and listings from their activity summary."""
+    summary = UserActivity.objects.filter(pk=request.user.pk).first()
+    if summary is None:
+        summary = UserActivity(user=request.user)
+    section = request.GET.get("section")
+    if section not in ACTIVITY_SECTIONS:
+        section = "winning"
+    # Most recently changed first
+    ids = getattr(summary, section)[::-1]
+    page = paginate_ids(request, Listing.objects.with_pricing(request.user), ids)
+    return render(
+        request,
+        "auctions/activity.html",
+        {
+            "summary": summary,
+            "sections": [
+                (name, title, len(getattr(summary, name)))
+                for name, title in ACTIVITY_SECTIONS.items()
+            ],
+            "section": section,
+            "listings": page.items,
+            "page": page,
+        },
+    )
 
 
 @login_required
@@ -85,22 +234,23 @@ def categories(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@feed_condition
 def category(request: HttpRequest, category_id: int) -> HttpResponse:
     """Render the auctions category page."""
     category = Category.objects.get(pk=category_id)
-    listings = category.listings.filter(active=True).all()
+    page = paginate(request, category.listings.active().with_pricing(request.user))
     return render(
-        request, "auctions/category.html", {"category": category, "listings": listings}
+        request,
+        "auctions/category.html",
+        {"category": category, "listings": page.items, "page": page},
     )
 
 
 @login_required
 def close_listing(request: HttpRequest, listing_id: int) -> HttpResponse:
     """Close the listing."""
-    listing = Listing.objects.get(pk=listing_id)
-    listing.active = False
-    listing.save()
-    return redirect("listing", listing_id=listing.id)
+    close_listings([listing_id])
+    return redirect("listing", listing_id=listing_id)
 
 
 @login_required
@@ -154,39 +304,118 @@ def create_listing(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@feed_condition
 def index(request: HttpRequest) -> HttpResponse:
     """Render the auctions index page."""
+    filter_form = ListingFilterForm(request.GET)
+    listings, ordering = filter_form.filter(Listing.objects.with_pricing(request.user))
+    page = paginate(request, listings, ordering)
     return render(
         request,
         "auctions/index.html",
         {
-            "listings": Listing.objects.filter(active=True).all(),
+            "filter_form": filter_form,
+            "listings": page.items,
+            "page": page,
         },
     )
 
 
 @login_required
+@listing_condition
 def listing(request: HttpRequest, listing_id: int) -> HttpResponse:
     """Render the auctions listing page that supports GET and POST."""
-    listing = Listing.objects.get(pk=listing_id)
+    listing = Listing.objects.select_related("high_bidder").get(pk=listing_id)
     if request.method == "POST":
         # Take in the data the user submitted and save it as form
         bid_form = BidForm(request.POST, listing=listing)
         # Check if form data is valid (server-side)
         if bid_form.is_valid():
-            bid = bid_form.save(commit=False)
-            bid.user = request.user
-            bid.listing = listing
-            bid.save()
-            return redirect("listing", listing_id=listing.id)
+            price = bid_form.cleaned_data["price"]
+            if bid_form.cleaned_data["maximum"]:
+                result = set_max_bid(listing.id, request.user, price)
+            else:
+                result = place_bid(listing.id, request.user, price)
+            if result.accepted:
+                return redirect("listing", listing_id=listing.id)
+            bid_form.add_error("price", result.message)
     else:
         bid_form = BidForm(listing=listing)
     comment_form = CommentForm()
+    # Oldest first, a page at a time, with each author joined in
+    page = paginate(request, listing.comments.select_related("user"), COMMENT_ORDERING)
     return render(
         request,
         "auctions/listing.html",
-        {"listing": listing, "bid_form": bid_form, "comment_form": comment_form},
+        {
+            "listing": listing,
+            "bid_form": bid_form,
+            "comment_form": comment_form,
+            "comments": page.items,
+            "page": page,
+            "live_updates": listing.active and supports_streaming(request),
+        },
+    )
+
+
+@login_required
+async def listing_events(request: HttpRequest, listing_id: int) -> HttpResponse:
+    """Stream the price and bid count of a listing as Server-Sent Events.
+
+    Each connection is an idle coroutine between bids, so streams are only served
+    by the ASGI application; under WSGI the answer is 204 No Content, which tells
+    `EventSource` not to reconnect.
+    """
+    if not supports_streaming(request):
+        return HttpResponse(status=204)
+    # Subscribe before reading the state, so an update in between is not lost
+    messages = get_broker().listen(
+        listing_channel(listing_id), settings.AUCTIONS_EVENTS_HEARTBEAT
     )
+    try:
+        state = (
+            await Listing.objects.filter(pk=listing_id)
+            .values("active", "current_price", "bid_count", "high_bidder__username")
+            .afirst()
+        )
+    except BaseException:
+        await messages.aclose()
+        raise
+    if state is None:
+        await messages.aclose()
+        raise Http404("Listing not found.")
+
+    async def stream():
+        try:
+            yield server_sent_event(
+                {
+                    "event": "bid",
+                    "listing": listing_id,
+                    "price": str(state["current_price"]),
+                    "bid_count": state["bid_count"],
+                    "high_bidder": state["high_bidder__username"],
+                }
+            )
+            if not state["active"]:
+                yield server_sent_event({"event": "closed", "listing": listing_id})
+                return
+            async for message in messages:
+                # Comment lines keep proxies from timing out idle connections
+                yield server_sent_event(message) if message else ": keepalive\n\n"
+                if message and message["event"] == "closed":
+                    return
+        finally:
+            await messages.aclose()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def server_sent_event(message: dict) -> str:
+    """Format a broker message as a Server-Sent Event."""
+    return f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
 
 
 def login_view(request: HttpRequest) -> HttpResponse:
@@ -214,6 +443,23 @@ def logout_view(request: HttpRequest) -> HttpResponse:
     return redirect("index")
 
 
+@staff_member_required
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Render the request metrics of each view, or Prometheus text with `?format`."""
+    if request.GET.get("format") == "prometheus":
+        return HttpResponse(
+            registry.prometheus(), content_type="text/plain; version=0.0.4"
+        )
+    return render(
+        request,
+        "auctions/metrics.html",
+        {
+            "views": registry.snapshot(),
+            "sample_rate": settings.AUCTIONS_METRICS_SAMPLE_RATE,
+        },
+    )
+
+
 def register(request: HttpRequest) -> HttpResponse:
     """Render the register new user page that supports GET and POST."""
     if request.method == "POST":
@@ -241,24 +487,75 @@ def register(request: HttpRequest) -> HttpResponse:
     return render(request, "auctions/register.html")
 
 
+@login_required
+def search(request: HttpRequest) -> HttpResponse:
+    """Render the listings that best match the `q` query parameter."""
+    query = request.GET.get("q", "").strip()
+    ids = search_listings(query, page_size(request))
+    listings = Listing.objects.filter(pk__in=ids).with_pricing(request.user)
+    rank = {listing_id: position for position, listing_id in enumerate(ids)}
+    return render(
+        request,
+        "auctions/search.html",
+        {
+            "query": query,
+            "listings": sorted(listings, key=lambda listing: rank[listing.id]),
+        },
+    )
+
+
+@require_safe
+def thumbnail(request: HttpRequest, token: str, width: int, fmt: str) -> HttpResponse:
+    """Serve a resized copy of a signed image URL from the thumbnail cache.
+
+    The URL changes whenever the image does, so the response may be cached for
+    good. Images that cannot be fetched or decoded fall back to the original.
+    """
+    if width not in thumbnails.WIDTHS or fmt not in thumbnails.FORMATS:
+        raise Http404("Unknown thumbnail size.")
+    try:
+        url = thumbnails.unsign(token)
+    except BadSignature:
+        raise Http404("Unknown image.")
+    try:
+        file = thumbnails.open_thumbnail(url, width, fmt)
+    except thumbnails.ThumbnailError:
+        return HttpResponseRedirect(url)
+    response = FileResponse(file, content_type=thumbnails.FORMATS[fmt][1])
+    patch_cache_control(
+        response, public=True, max_age=thumbnails.MAX_AGE, immutable=True
+    )
+    return response
+
+
 @login_required
 def toggle_watchlist(request: HttpRequest, listing_id: int) -> HttpResponse:
     """Add or remove listing from user's watchlist."""
-    listing = Listing.objects.get(pk=listing_id)
-    if listing in request.user.watchlist.all():
-        request.user.watchlist.remove(listing)
+    if not Listing.objects.filter(pk=listing_id).exists():
+        raise Http404("Listing not found.")
+    # Removing reports whether the listing was watched, so it doubles as the test
+    watching = User.watchlist.through.objects.filter(
+        user=request.user, listing=listing_id
+    )
+    if watching.delete()[0]:
+        # The delete bypasses `m2m_changed`, which marks the listing changed on add
+        Listing.objects.filter(pk=listing_id).touch()
     else:
-        request.user.watchlist.add(listing)
-    return redirect("listing", listing_id=listing.id)
+        request.user.watchlist.add(listing_id)
+    cache.delete(watchlist_cache_key(request.user.pk))
+    return redirect("listing", listing_id=listing_id)
 
 
 @login_required
+@feed_condition
 def watchlist(request: HttpRequest) -> HttpResponse:
     """Render the auctions watchlist page."""
+    page = paginate(request, request.user.watchlist.with_pricing(request.user))
     return render(
         request,
         "auctions/watchlist.html",
         {
-            "listings": request.user.watchlist.all(),
+            "listings": page.items,
+            "page": page,
         },
     )
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import sys
+from decimal import Decimal
 
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -31,6 +34,28 @@ ALLOWED_HOSTS = ["*"]
 
 LOGIN_URL = "/login"
 
+# Listing feeds are paginated by keyset; `?size=` may ask for up to the max
+AUCTIONS_PAGE_SIZE = int(os.environ.get("AUCTIONS_PAGE_SIZE", "25"))
+AUCTIONS_MAX_PAGE_SIZE = int(os.environ.get("AUCTIONS_MAX_PAGE_SIZE", "100"))
+
+# How many times a bid that lost a race for the listing row is retried
+AUCTIONS_BID_RETRIES = int(os.environ.get("AUCTIONS_BID_RETRIES", "5"))
+# Steps in which maximum bids outbid each other (see `auctions/proxy.py`)
+AUCTIONS_BID_INCREMENT = Decimal(os.environ.get("AUCTIONS_BID_INCREMENT", "0.01"))
+# Most bids one request to the batch bid API may carry
+AUCTIONS_BID_BATCH_SIZE = int(os.environ.get("AUCTIONS_BID_BATCH_SIZE", "1000"))
+
+# Live bid updates: the pub/sub broker class and the keepalive interval in seconds
+AUCTIONS_EVENT_BROKER = os.environ.get(
+    "AUCTIONS_EVENT_BROKER", "auctions.events.InProcessBroker"
+)
+AUCTIONS_EVENTS_HEARTBEAT = float(os.environ.get("AUCTIONS_EVENTS_HEARTBEAT", "15"))
+
+# Fraction of requests timed by QueryMetricsMiddleware (0 disables it entirely)
+AUCTIONS_METRICS_SAMPLE_RATE = float(
+    os.environ.get("AUCTIONS_METRICS_SAMPLE_RATE", "1" if DEBUG else "0")
+)
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -46,6 +71,7 @@ INSTALLED_APPS = [
 # Middleware (add Whitenoise)
 MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "auctions.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -70,6 +96,8 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "auctions.context_processors.listing_cards",
+                "auctions.context_processors.watchlist",
             ],
         },
     },
@@ -81,10 +109,119 @@ WSGI_APPLICATION = "commerce.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 # Database config for Render
-DATABASES = {"default": dj_database_url.config(default="sqlite:///db.sqlite3")}
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them at the end
+# of each request) and checked before they are reused. Under ASGI, queries run in
+# worker threads whose persistent connections are never closed at the end of a
+# request, so there it defaults to 0 (use DB_POOL on PostgreSQL instead)
+ASGI = "commerce.asgi" in sys.modules
+DATABASES = {
+    "default": dj_database_url.config(
+        default="sqlite:///db.sqlite3",
+        conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", "0" if ASGI else "600")),
+        conn_health_checks=os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True",
+    )
+}
+DB_POOL = os.environ.get("DB_POOL", "False") == "True"
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and DB_POOL:
+    # psycopg's connection pool (needs `psycopg[pool]`) replaces persistent
+    # connections: each request borrows a connection and returns it afterwards
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+    }
+elif DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # WAL lets readers run alongside a writer; transactions take the write lock
+    # up front so they wait for it (up to `timeout` seconds) instead of failing
+    # when a read lock cannot be upgraded
+    DATABASES["default"].setdefault("OPTIONS", {}).update(
+        {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+            "timeout": float(os.environ.get("DB_SQLITE_TIMEOUT", "20")),
+            "transaction_mode": "IMMEDIATE",
+        }
+    )
 
 AUTH_USER_MODEL = "auctions.User"
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND is "locmem" (per process), "file", "redis" (any server speaking the
+# Redis protocol; needs the `redis` package) or the dotted path of another backend
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "commerce"),
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        os.path.join(BASE_DIR, "cache"),
+    ),
+    "redis": (
+        "django.core.cache.backends.redis.RedisCache",
+        "redis://127.0.0.1:6379/1",
+    ),
+}
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+# Whether every worker process sees the same cache; invalidating a per-process
+# locmem entry only reaches the worker that did it
+CACHE_SHARED = CACHE_BACKEND != "locmem"
+CACHE_BACKEND_PATH, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS.get(
+    CACHE_BACKEND, (CACHE_BACKEND, "")
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND_PATH,
+        "LOCATION": os.environ.get("CACHE_LOCATION", CACHE_DEFAULT_LOCATION),
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", "300")),
+        "KEY_PREFIX": "commerce",
+    }
+}
+
+# Listing cards are cached under a versioned key, so they can live for a long time
+AUCTIONS_CARD_CACHE_TIMEOUT = int(os.environ.get("AUCTIONS_CARD_CACHE_TIMEOUT", "3600"))
+
+# Each user's watched listing ids are cached between requests (0 disables it, so
+# they are only loaded once per request); off by default unless the cache is shared
+AUCTIONS_WATCHLIST_CACHE_TIMEOUT = int(
+    os.environ.get("AUCTIONS_WATCHLIST_CACHE_TIMEOUT", "3600" if CACHE_SHARED else "0")
+)
+
+# Thumbnails of listing and category images are cached on disk; past the size
+# limit the least recently used files are deleted
+AUCTIONS_THUMBNAIL_DIR = os.environ.get(
+    "AUCTIONS_THUMBNAIL_DIR", os.path.join(BASE_DIR, "thumbnails")
+)
+AUCTIONS_THUMBNAIL_CACHE_BYTES = int(
+    os.environ.get("AUCTIONS_THUMBNAIL_CACHE_BYTES", str(256 * 1024 * 1024))
+)
+AUCTIONS_THUMBNAIL_MAX_SOURCE_BYTES = int(
+    os.environ.get("AUCTIONS_THUMBNAIL_MAX_SOURCE_BYTES", str(10 * 1024 * 1024))
+)
+# Originals on loopback or private addresses are refused unless this is on
+AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS = (
+    os.environ.get("AUCTIONS_THUMBNAIL_ALLOW_PRIVATE_HOSTS", "False") == "True"
+)
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+# SESSION_BACKEND is "db", "cached_db" (read through the cache, written to both),
+# "cache" (lost when the cache is cleared) or "signed_cookies" (no server storage,
+# but logging out cannot revoke a copied cookie) or the dotted path of another
+# session engine. The cache-backed ones need a cache shared by all workers: with a
+# per-process cache, a session flushed by one worker stays valid in the others.
+SESSION_BACKENDS = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "db")
+if SESSION_BACKEND in ("cached_db", "cache") and not CACHE_SHARED:
+    raise ImproperlyConfigured(
+        f"SESSION_BACKEND={SESSION_BACKEND!r} needs a cache shared by all workers; "
+        f"set CACHE_BACKEND to 'file' or 'redis' instead of {CACHE_BACKEND!r}"
+    )
+SESSION_ENGINE = SESSION_BACKENDS.get(SESSION_BACKEND, SESSION_BACKEND)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -122,3 +259,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATIC_URL = "/static/"
+
+# collectstatic writes content-hashed copies of every file with gzip and Brotli
+# (needs the `Brotli` package) variants beside them; WhiteNoise serves the
+# hashed names with far-future cache headers. Run `collectstatic` before serving
+# with DEBUG off, since templates look the hashed names up in its manifest.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"
+    },
+}
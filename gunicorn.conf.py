@@ -0,0 +1,79 @@
+"""
+Gunicorn configuration for commerce, read automatically by `gunicorn` from the
+project root.
+
+GUNICORN_PROFILE picks the worker model:
+
+* "sync": one request per process, the gunicorn default.
+* "gthread" (default): several threads per process, so requests waiting on the
+  database or the network do not hold a whole process.
+* "uvicorn": asyncio workers serving `commerce.asgi`. Only this profile serves
+  the live bid streams of listing pages; under the WSGI profiles the pages do
+  without live updates. Its sync views run one at a time per worker, on fresh
+  database connections unless DB_POOL is on, so pages are slower than under
+  gthread.
+
+Live bid updates go through AUCTIONS_EVENT_BROKER; the default in-process
+broker only reaches clients connected to the same worker.
+
+For more information on this file, see
+https://docs.gunicorn.org/en/stable/settings.html
+"""
+
+import multiprocessing
+import os
+
+PROFILES = {
+    "sync": {
+        "worker_class": "sync",
+        "wsgi_app": "commerce.wsgi:application",
+    },
+    "gthread": {
+        "worker_class": "gthread",
+        "wsgi_app": "commerce.wsgi:application",
+    },
+    "uvicorn": {
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "wsgi_app": "commerce.asgi:application",
+    },
+}
+profile = os.environ.get("GUNICORN_PROFILE", "gthread")
+if profile not in PROFILES:
+    raise RuntimeError(
+        f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}"
+    )
+worker_class = PROFILES[profile]["worker_class"]
+wsgi_app = PROFILES[profile]["wsgi_app"]
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Blocking workers need spare processes to cover I/O waits; asyncio workers
+# interleave requests themselves and need about one per core
+cores = multiprocessing.cpu_count()
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", cores if profile == "uvicorn" else cores * 2 + 1)
+)
+threads = int(os.environ.get("GUNICORN_THREADS", "4" if profile == "gthread" else "1"))
+
+# Import Django once in the master so workers share its memory copy-on-write
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+
+# Recycle workers now and then to contain slow leaks, staggered by the jitter so
+# they do not all restart at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# Keep idle client connections open long enough for a load balancer to reuse them
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
+
+
+def post_fork(server, worker):
+    # Database connections must not be shared with the master or other workers
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
@@ -7,5 +7,5 @@ set -o errexit
 pip install -r requirements.txt
 
 python manage.py migrate  # Run database migrations
-python manage.py collectstatic --noinput  # Collect static files
+python manage.py collectstatic --noinput  # Collect hashed, compressed static files
 python manage.py seed  # Seed the database with a couple of emails and users